@@ -0,0 +1,60 @@
+'''
+Benchmark the counter-based ``hashRand`` against ``ti.random``, filling a
+large field with uniform numbers and with 3-D unit vectors.
+
+Usage: ``python benchmarks/rand.py [arch]``
+'''
+
+import taichi as ti
+import taichi_glsl as ts
+import sys
+import time
+
+ti.init(arch=getattr(ti, sys.argv[1]) if len(sys.argv) > 1 else ti.gpu)
+
+N = 2**24
+
+
+@ti.kernel
+def fillRandom(x: ti.template(), k: ti.i32):
+    for i in x:
+        x[i] = ti.random()
+
+
+@ti.kernel
+def fillHash(x: ti.template(), k: ti.i32):
+    for i in x:
+        x[i] = ts.hashRand(233, i, k)
+
+
+@ti.kernel
+def fillRandomUnit3D(x: ti.template(), k: ti.i32):
+    for i in x:
+        x[i] = ts.randUnit3D()
+
+
+@ti.kernel
+def fillHashUnit3D(x: ti.template(), k: ti.i32):
+    for i in x:
+        x[i] = ts.hashUnit3D(233, i, k)
+
+
+def bench(name, fill, x, repeat):
+    fill(x, 0)  # compile & warm up
+    ti.sync()
+    t0 = time.perf_counter()
+    for k in range(repeat):
+        fill(x, k)
+    ti.sync()
+    dt = (time.perf_counter() - t0) / repeat
+    print(f'{name:<24}{dt * 1e3:>9.3f} ms{N / dt * 1e-9:>9.3f} G/s')
+    return dt
+
+
+if __name__ == '__main__':
+    x = ti.field(ti.f32, N)
+    bench('ti.random', fillRandom, x, 50)
+    bench('hashRand', fillHash, x, 50)
+    v = ti.Vector.field(3, ti.f32, N)
+    bench('randUnit3D', fillRandomUnit3D, v, 20)
+    bench('hashUnit3D', fillHashUnit3D, v, 20)
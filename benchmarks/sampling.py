@@ -0,0 +1,107 @@
+'''
+Benchmark the fused ``bilerp`` / ``trilerp`` against the previous per-tap
+implementation, in a semi-Lagrangian advection like ``examples/smoke.py``.
+
+Usage: ``python benchmarks/sampling.py [arch]``
+'''
+
+import taichi as ti
+import taichi_glsl as ts
+import sys
+import time
+
+ti.init(arch=getattr(ti, sys.argv[1]) if len(sys.argv) > 1 else ti.gpu)
+
+D = ts.D
+
+
+def bilerpPerTap(floor):
+    # The previous implementation, calling ``sample`` for each tap; with
+    # ``floor=False`` it truncates ``P`` like the original one, which is
+    # wrong for ``P`` in ``(-1, 0)`` but is the speed to match:
+    @ti.func
+    def bilerp(field: ti.template(), P):
+        I = int(P)
+        if ti.static(floor):
+            I = int(ti.floor(P))
+        x = P - I
+        y = 1 - x
+        return (ts.sample(field, I + D.xx) * x.x * x.y +
+                ts.sample(field, I + D.xy) * x.x * y.y +
+                ts.sample(field, I + D.yy) * y.x * y.y +
+                ts.sample(field, I + D.yx) * y.x * x.y)
+
+    return bilerp
+
+
+def trilerpPerTap(floor):
+    @ti.func
+    def trilerp(field: ti.template(), P):
+        I = int(P)
+        if ti.static(floor):
+            I = int(ti.floor(P))
+        w0 = P - I
+        w1 = 1.0 - w0
+        c00 = ts.sample(field, I + D.yyy) * w1.x + ts.sample(field,
+                                                             I + D.xyy) * w0.x
+        c01 = ts.sample(field, I + D.yyx) * w1.x + ts.sample(field,
+                                                             I + D.xyx) * w0.x
+        c10 = ts.sample(field, I + D.yxy) * w1.x + ts.sample(field,
+                                                             I + D.xxy) * w0.x
+        c11 = ts.sample(field, I + D.yxx) * w1.x + ts.sample(field,
+                                                             I + D.xxx) * w0.x
+        c0 = c00 * w1.y + c10 * w0.y
+        c1 = c01 * w1.y + c11 * w0.y
+        return c0 * w1.z + c1 * w0.z
+
+    return trilerp
+
+
+def make_advect(sampler):
+    @ti.kernel
+    def advect(vel: ti.template(), src: ti.template(), dst: ti.template()):
+        for I in ti.grouped(dst):
+            dst[I] = sampler(src, I - vel[I] * 0.5)
+
+    return advect
+
+
+@ti.kernel
+def init(vel: ti.template(), src: ti.template()):
+    for I in ti.grouped(vel):
+        # Velocities of a few cells, so that taps are scattered:
+        vel[I] = ti.sin(I * 0.37) * 3
+        src[I] = I * 0.01
+
+
+def bench(name, advect, vel, src, dst, repeat):
+    advect(vel, src, dst)  # compile & warm up
+    ti.sync()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        advect(vel, src, dst)
+    ti.sync()
+    dt = (time.perf_counter() - t0) / repeat
+    print(f'{name:<24}{dt * 1e3:>9.3f} ms')
+    return dt
+
+
+def run(dim, n, repeat, per_tap, fused):
+    shape = (n, ) * dim
+    vel = ti.Vector.field(dim, ti.f32, shape)
+    src = ti.Vector.field(dim, ti.f32, shape)
+    dst = ti.Vector.field(dim, ti.f32, shape)
+    init(vel, src)
+    print(f'{n}^{dim} grid:')
+    t0 = bench('per-tap, truncating', make_advect(per_tap(False)), vel, src,
+               dst, repeat)
+    bench('per-tap, flooring', make_advect(per_tap(True)), vel, src, dst,
+          repeat)
+    t1 = bench('fused', make_advect(fused), vel, src, dst, repeat)
+    # Against the shipped truncating version, not the flooring reference:
+    print(f'{"speed-up":<24}{t0 / t1:>9.2f} x')
+
+
+if __name__ == '__main__':
+    run(2, 512, 200, bilerpPerTap, ts.bilerp)
+    run(3, 128, 50, trilerpPerTap, ts.trilerp)
@@ -0,0 +1,38 @@
+import taichi as ti
+import numpy as np
+
+import taichi_glsl as ts
+
+ti.init(arch=ti.gpu)
+
+
+class MyAnimation(ts.Animation):
+    def on_init(self):
+        self.N = 128
+        self.title = 'Diffusion Ensemble'
+        self.ens = ts.Ensemble(16, kappa=np.linspace(0.02, 0.24, 16))
+        self.ensemble = self.ens
+        self.img = self.ens.field(ti.f32, (self.N, self.N))
+        self.tmp = self.ens.field(ti.f32, (self.N, self.N))
+
+    @ti.kernel
+    def on_start(self):
+        for b, i, j in self.img:
+            self.img[b, i, j] = ts.imageChess(ts.vec(i, j) / self.N, 8)
+
+    @ti.kernel
+    def on_advance(self):
+        for b, i, j in self.img:
+            l = self.img[b, max(i - 1, 0), j]
+            r = self.img[b, min(i + 1, self.N - 1), j]
+            d = self.img[b, i, max(j - 1, 0)]
+            u = self.img[b, i, min(j + 1, self.N - 1)]
+            lap = l + r + d + u - 4 * self.img[b, i, j]
+            self.tmp[b, i, j] = self.img[b, i, j] + self.ens.kappa[b] * lap
+        for I in ti.grouped(self.img):
+            self.img[I] = self.tmp[I]
+
+
+if __name__ == '__main__':
+    animation = MyAnimation()
+    animation.start()
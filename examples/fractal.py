@@ -1,4 +1,3 @@
-import matplotlib.cm as cm
 import taichi as ti
 
 import taichi_glsl as tl
@@ -11,7 +10,7 @@ class MyAnimation(tl.Animation):
         self.n = n
         self.title = 'Julia Set'
         self.img = ti.var(ti.f32, (self.n * 2, self.n))
-        self.colormap = cm.get_cmap('magma')
+        self.colormap = 'magma'
         self.define_input()
 
     @ti.kernel
@@ -18,11 +18,9 @@ class MyAnimation(ts.Animation):
         self.title = 'Particles'
         self.define_input()
 
-    @ti.kernel
     def on_start(self):
-        for i in self.pos:
-            self.pos[i] = ts.randND(2)
-            self.vel[i] = ts.randSolid2D()
+        ts.fillUniform(self.pos)
+        ts.fillSolid2D(self.vel)
 
     @ti.kernel
     def on_advance(self):
@@ -3,8 +3,6 @@ from taichi_glsl import *
 ti.init(ti.opengl)
 
 fov = math.tan(math.radians(26))
-img = vec_array(3, float, 512, 512)
-mouse = vec_uniform(2, float)
 eps = 1e-5
 
 
@@ -28,35 +26,34 @@ def mIntersect(a, b):
 
 
 @ti.func
-def mScene(p):
-    m = mouse[None]
+def mScene(p, m):
     return mUnion(  #       center         rad   emi  spec
         vec(sdfSphere(p, vec(m.x, m.y, 0.0), 0.2), 1.0, 0.0),
         vec(sdfSphere(p, vec(0.0, 0.0, 0.4), 0.5), 0.2, 1.0))
 
 
 @ti.func
-def gradScene(p, sdf):
+def gradScene(p, m, sdf):
     return normalize(
         vec(
-            mScene(p + vec(eps, 0, 0))[0],
-            mScene(p + vec(0, eps, 0))[0],
-            mScene(p + vec(0, 0, eps))[0]) - sdf)
+            mScene(p + vec(eps, 0, 0), m)[0],
+            mScene(p + vec(0, eps, 0), m)[0],
+            mScene(p + vec(0, 0, eps), m)[0]) - sdf)
 
 
 @ti.func
-def radiance(eye, dir):
+def radiance(eye, dir, m):
     p = eye
     clr = vec3(0.0)
     depth = 0.0
     for i in range(50):
-        res = mScene(p)
+        res = mScene(p, m)
         sdf, emi, spec = res[0], res[1], res[2]
         if sdf < eps:
             clr += vec3(emi)
             if spec != 0:
                 if rand() < spec:
-                    norm = gradScene(p, sdf)
+                    norm = gradScene(p, m, sdf)
                     dir = reflect(dir, norm)
                     p += 2 * eps * dir
                     continue
@@ -66,22 +63,28 @@ def radiance(eye, dir):
     return clr
 
 
-@ti.kernel
-def render():
-    eye = vec(0.0, 0.0, -1.8)
-    for i, j in img:
-        coor = fov * (view(img, i, j) * 2.0 - 1.0)
-        dir = normalize(vec(coor, 1.0))
-        img[i, j] = radiance(eye, dir)
-
-
-mouse[None] = [-0.5, 0.5]
-gui = ti.GUI('SDF-RT1')
-while gui.running:
-    gui.running = not gui.get_event(gui.ESCAPE)
-    if gui.is_pressed(gui.LMB):
-        x, y = gui.get_cursor_pos()
-        mouse[None] = [x * 2 - 1, y * 2 - 1]
-    render()
-    gui.set_image(img)
-    gui.show()
+class SDFRT1(Animation):
+    def on_init(self):
+        self.title = 'SDF-RT1'
+        self.img = vec_array(3, float, 512, 512)
+        # Render at a lower resolution while the frame rate drops below 30:
+        self.target_fps = 30
+        self.define_input()
+        self.define_uniform('iSphere', 2)
+        self.set_uniform('iSphere', (-0.5, 0.5))
+
+    def on_clicking(self, x, y, btn):
+        if btn == ti.GUI.LMB:
+            self.set_uniform('iSphere', (x * 2 - 1, y * 2 - 1))
+
+    @ti.kernel
+    def on_render(self):
+        eye = vec(0.0, 0.0, -1.8)
+        res = self.iRenderResolution
+        for i, j in ti.ndrange(res.x, res.y):
+            coor = fov * (vec(i, j) / res * 2.0 - 1.0)
+            dir = normalize(vec(coor, 1.0))
+            self.img[i, j] = radiance(eye, dir, self.uniform('iSphere'))
+
+
+SDFRT1().start()
@@ -1,11 +1,10 @@
-import matplotlib.cm as cm
 import taichi as ti
 
 import taichi_glsl as ts
 
 ti.init(arch=ti.gpu)
 
-cmap = cm.get_cmap('magma')
+cmap = ts.ColormapLUT('magma')
 
 N = 512
 dx = 1 / N
@@ -25,6 +24,7 @@ dye = Pair(lambda: ts.array(float, N, N))
 pre = Pair(lambda: ts.array(float, N, N))
 vel = Pair(lambda: ti.Vector(2, ti.f32, (N, N)))
 div = ts.array(float, N, N)
+img = ti.Vector.field(3, ti.f32, (N, N))
 
 
 @ti.kernel
@@ -151,5 +151,6 @@ if __name__ == '__main__':
 
         subgrad(vel.o, pre.o)
 
-        gui.set_image(cmap(dye.o.to_numpy()))
+        cmap.apply(dye.o, img)
+        gui.set_image(img)
         gui.show()
@@ -13,6 +13,8 @@ from .vector import *
 from .odop import *
 from .randgen import *
 from .sampling import *
+from .mipmap import *
+from .sat import *
 from .lagrangian import *
 from .experimental_array import *
 from .experimental_transform import *
@@ -22,4 +24,10 @@ from .painting import *
 from .mkimages import *
 from .sphcore import *
 from .classes import *
+from .ensemble import *
+from .framesink import *
+from .headless import *
+from .recorder import *
+from .profiler import *
+from .notebook import *
 from .gui import *
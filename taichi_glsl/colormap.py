@@ -46,3 +46,115 @@ def blueorange(rgb):
     blue = ts.vec(0.00, 0.01, 0.05)
     orange = ts.vec(1.19, 1.04, 0.98)
     return ti.sqrt(ts.mix(blue, orange, rgb))
+
+
+@ti.data_oriented
+class ColormapLUT:
+    '''
+    Apply a ``matplotlib`` color map inside Taichi kernels.
+
+    The color map is baked once into a small lookup table field, then a
+    scalar field is mapped into an RGB field entirely on device, so that
+    only the final image need to be copied to host for display.
+
+    :parameter cmap: (string or ``matplotlib`` color map)
+        Specify the color map, e.g. ``'magma'`` or ``matplotlib.colormaps['magma']``.
+
+    :parameter n: (int)
+        Specify the number of entries in the lookup table.
+
+    :parameter vmin: (scalar)
+        Specify the value mapped to the lowest color.
+
+    :parameter vmax: (scalar)
+        Specify the value mapped to the highest color.
+
+    :parameter normalize: (boolean)
+        If true, use the min and max value of source field as ``vmin`` and
+        ``vmax`` on each ``apply``.
+
+    For example::
+
+        cmap = ts.ColormapLUT('magma')
+        img = ti.Vector.field(3, ti.f32, dye.shape)
+        ...
+        cmap.apply(dye, img)
+        gui.set_image(img)
+    '''
+    def __init__(self, cmap='magma', n=256, vmin=0, vmax=1, normalize=False):
+        if isinstance(cmap, str):
+            import matplotlib
+            try:
+                cmap = matplotlib.colormaps[cmap]
+            except AttributeError:  # matplotlib < 3.5
+                import matplotlib.pyplot as plt
+                cmap = plt.get_cmap(cmap)
+        self.cmap = cmap
+        self.n = n
+        self.vmin = vmin
+        self.vmax = vmax
+        self.normalize = normalize
+        self.lut = ti.Vector.field(3, ti.f32, n)
+        self.range = ti.field(ti.f32, 2)
+        self.baked = False
+        self._uploaded_range = None
+
+    def bake(self):
+        '''
+        Sample the color map into the lookup table field.
+        '''
+        import numpy as np
+        lut = self.cmap(np.linspace(0, 1, self.n))[:, :3]
+        self.lut.from_numpy(lut.astype(np.float32))
+        self.baked = True
+
+    @ti.func
+    def map(self, x):
+        '''
+        Map a scalar into RGB color, can be used in your own kernels too.
+
+        :parameter x: (scalar)
+            The value to map.
+
+        :return:
+            A 3D vector, linearly interpolated between the two nearest
+            entries of the lookup table.
+        '''
+        lo, hi = self.range[0], self.range[1]
+        t = ts.clamp((x - lo) / max(hi - lo, 1e-8)) * (self.n - 1)
+        i = min(int(t), self.n - 2)
+        return ts.mix(self.lut[i], self.lut[i + 1], t - i)
+
+    @ti.kernel
+    def _find_range(self, src: ti.template()):
+        self.range[0] = src[ti.Vector.zero(ti.i32, len(src.shape))]
+        self.range[1] = self.range[0]
+        for I in ti.grouped(src):
+            ti.atomic_min(self.range[0], src[I])
+            ti.atomic_max(self.range[1], src[I])
+
+    @ti.kernel
+    def _apply(self, src: ti.template(), dst: ti.template()):
+        for I in ti.grouped(src):
+            dst[I] = self.map(src[I])
+
+    def apply(self, src, dst):
+        '''
+        Map the scalar field ``src`` into the RGB field ``dst``.
+
+        :parameter src: (scalar Tensor)
+            Specify the field to map.
+
+        :parameter dst: (3D vector Tensor)
+            Specify the field to store colors, of the same shape as ``src``.
+        '''
+        if not self.baked:
+            self.bake()
+        if self.normalize:
+            self._find_range(src)
+            self._uploaded_range = None
+        elif self._uploaded_range != (self.vmin, self.vmax):
+            self.range[0] = self.vmin
+            self.range[1] = self.vmax
+            self._uploaded_range = (self.vmin, self.vmax)
+        self._apply(src, dst)
@@ -0,0 +1,122 @@
+'''
+Run many parameterized instances of a simulation in batched kernels.
+'''
+
+import taichi as ti
+import numpy as np
+import math
+
+
+@ti.data_oriented
+class Ensemble:
+    '''
+    Batch ``n`` instances of a simulation into the same fields & kernels.
+
+    Fields created by :meth:`field` have a leading batch dimension, and
+    per-instance parameters are stored in 1D fields, so that a single
+    kernel launch advances all instances, and kernels are compiled only
+    once for the whole parameter sweep.
+
+    :parameter n: (int)
+        Specify the number of instances.
+
+    :parameter params:
+        Specify per-instance parameters as ``name=values``, see :meth:`param`.
+
+    For example::
+
+        class MyAnimation(ts.Animation):
+            def on_init(self):
+                self.ens = ts.Ensemble(16, kappa=np.linspace(0.01, 0.2, 16))
+                self.ensemble = self.ens  # display instances in a mosaic
+                self.img = self.ens.field(ti.f32, (128, 128))
+
+            @ti.kernel
+            def on_advance(self):
+                for b, i, j in self.img:
+                    kappa = self.ens.kappa[b]
+                    ...
+    '''
+    def __init__(self, n, **params):
+        self.n = n
+        self.params = {}
+        self.cols = math.ceil(math.sqrt(n))
+        self.rows = math.ceil(n / self.cols)
+        for name, values in params.items():
+            self.param(name, values)
+
+    def _shape(self, shape):
+        if isinstance(shape, int):
+            shape = (shape, )
+        return (self.n, *shape)
+
+    def field(self, dtype, shape=()):
+        '''
+        Create a scalar field of shape ``(n, *shape)``.
+        '''
+        return ti.field(dtype, self._shape(shape))
+
+    def vec_field(self, n, dtype, shape=()):
+        '''
+        Create a vector field of shape ``(n, *shape)``.
+        '''
+        return ti.Vector.field(n, dtype, self._shape(shape))
+
+    def mat_field(self, n, m, dtype, shape=()):
+        '''
+        Create a matrix field of shape ``(n, *shape)``.
+        '''
+        return ti.Matrix.field(n, m, dtype, self._shape(shape))
+
+    def param(self, name, values, dtype=ti.f32):
+        '''
+        Define a per-instance parameter, accessible as ``ensemble.name[b]``
+        in kernels, where ``b`` is the instance index.
+
+        :parameter values: (list or numpy array)
+            Specify the values of each instance, of length ``n``.
+        '''
+        values = np.asarray(values)
+        if values.shape[0] != self.n:
+            raise ValueError(f'Expect {self.n} values for {name}, '
+                             f'got {values.shape[0]}')
+        if values.ndim == 1:
+            field = ti.field(dtype, self.n)
+        else:
+            field = ti.Vector.field(values.shape[1], dtype, self.n)
+        field.from_numpy(values.astype(ti.to_numpy_type(dtype)))
+        self.params[name] = field
+        return field
+
+    def __getattr__(self, name):
+        params = self.__dict__.get('params', {})
+        if name in params:
+            return params[name]
+        raise AttributeError(name)
+
+    def mosaic_res(self, shape):
+        '''
+        Get the resolution of the mosaic of batched images of ``shape``.
+        '''
+        return shape[1] * self.cols, shape[2] * self.rows
+
+    def mosaic_field(self, src):
+        '''
+        Create a field to hold the mosaic of ``src``, of the same type.
+        '''
+        res = self.mosaic_res(src.shape)
+        if hasattr(src, 'n'):
+            return ti.Vector.field(src.n, src.dtype, res)
+        return ti.field(src.dtype, res)
+
+    @ti.kernel
+    def mosaic(self, src: ti.template(), dst: ti.template()):
+        '''
+        Tile the images of each instance in ``src`` into ``dst``, with the
+        first instance at top-left.
+        '''
+        w, h = ti.static(src.shape[1], src.shape[2])
+        for I in ti.grouped(dst):
+            b = (self.rows - 1 - I.y // h) * self.cols + I.x // w
+            if b < self.n:
+                dst[I] = src[b, I.x % w, I.y % h]
@@ -0,0 +1,406 @@
+'''
+Frame sinks receiving finished frames from ``ts.Animation``.
+'''
+
+import taichi as ti
+import numpy as np
+import threading
+import queue
+import os
+
+
+def _to_pixels(img, rgb=True):
+    '''
+    Convert an image of the ``to_numpy()`` layout into row-major uint8
+    pixels with the first row at top, as image libraries expect.
+
+    :parameter rgb: (boolean)
+        If true, expand gray images and drop alpha, to 3 channels.
+    '''
+    if rgb:
+        if img.ndim == 2:
+            img = img[:, :, None]
+        if img.shape[2] == 1:
+            img = np.repeat(img, 3, axis=2)
+        img = img[:, :, :3]
+    if img.dtype != np.uint8:
+        img = (np.clip(img, 0, 1) * 255).astype(np.uint8)
+    # Taichi images are indexed by (x, y) with y pointing up:
+    return np.ascontiguousarray(img.swapaxes(0, 1)[::-1])
+
+
+class FrameSink:
+    '''
+    Base class of frame sinks.
+
+    A sink is fed with ``sink.write(frame, img)`` once per shown frame,
+    where ``frame`` is the frame number and ``img`` is a numpy array of
+    the same layout as ``self.img.to_numpy()``, i.e. ``(width, height)``
+    or ``(width, height, channels)``.
+
+    ``sink.close()`` is called when the animation exits.
+    '''
+    def write(self, frame, img):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CallbackSink(FrameSink):
+    '''
+    Invoke ``callback(frame, img)`` on every frame.
+    '''
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, frame, img):
+        self.callback(frame, img)
+
+
+class RingBufferSink(FrameSink):
+    '''
+    Keep the latest ``capacity`` frames in a preallocated numpy buffer.
+
+    :parameter capacity: (int)
+        Specify how many frames to keep.
+
+    :note:
+        The buffer is allocated on the first frame according to its shape
+        and dtype, all later frames must have the same shape.
+    '''
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.buffer = None
+        self.frame_ids = np.full(capacity, -1, dtype=np.int64)
+        self.count = 0
+
+    def write(self, frame, img):
+        if self.buffer is None:
+            self.buffer = np.empty((self.capacity, *img.shape),
+                                   dtype=img.dtype)
+        slot = self.count % self.capacity
+        self.buffer[slot] = img
+        self.frame_ids[slot] = frame
+        self.count += 1
+
+    def _order(self):
+        n = min(self.count, self.capacity)
+        start = self.count - n
+        return [i % self.capacity for i in range(start, self.count)]
+
+    @property
+    def frames(self):
+        '''
+        (PS, numpy array, RO) Buffered frames, from the oldest to the latest.
+        '''
+        if self.buffer is None:
+            return None
+        return self.buffer[self._order()]
+
+    @property
+    def latest(self):
+        '''
+        (PS, numpy array, RO) The latest frame, ``None`` if no frame yet.
+        '''
+        if self.count == 0:
+            return None
+        return self.buffer[(self.count - 1) % self.capacity]
+
+
+class FileSink(FrameSink):
+    '''
+    Write each frame to a file, whose path is ``pattern.format(frame)``.
+
+    :parameter pattern: (string)
+        Specify the path pattern, e.g. ``'/tmp/frames/{:06d}.png'``.
+        The file format is decided by the extension:
+
+        * ``.npy``: uncompressed, original dtype, saved by ``np.save``.
+        * ``.raw``: headerless float32 dump, in the layout of ``to_numpy()``.
+        * ``.png``: compressed with ``png_compression`` level if ``Pillow``
+          is installed, otherwise saved by ``ti.imwrite``.
+        * other image formats: saved by ``ti.imwrite``.
+
+    :parameter png_compression: (int)
+        Specify the PNG compression level, from 0 (fastest) to 9 (smallest).
+    '''
+    def __init__(self, pattern, png_compression=1):
+        self.pattern = pattern
+        self.png_compression = png_compression
+        output_dir = os.path.dirname(pattern)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def _write_png(self, img, path):
+        try:
+            from PIL import Image
+        except ImportError:
+            return ti.imwrite(img, path)
+        img = _to_pixels(img, rgb=False)
+        Image.fromarray(img).save(path, compress_level=self.png_compression)
+
+    def write(self, frame, img):
+        path = self.pattern.format(frame)
+        if path.endswith('.npy'):
+            np.save(path, img)
+        elif path.endswith('.raw'):
+            img.astype(np.float32).tofile(path)
+        elif path.endswith('.png'):
+            self._write_png(img, path)
+        else:
+            ti.imwrite(img, path)
+
+
+class PipelinedSink(FrameSink):
+    '''
+    Forward frames to another sink on a background worker thread.
+
+    The render loop only pays for the device-to-host copy, while the
+    (possibly slow) writing of the wrapped sink overlaps with the
+    computation of next frames.
+
+    :parameter sink: (FrameSink)
+        Specify the sink to forward frames to.
+
+    :parameter depth: (int)
+        Specify the max number of frames in flight. When the worker falls
+        behind, ``write`` blocks until a slot is free (backpressure).
+    '''
+    _STOP = object()
+
+    def __init__(self, sink, depth=4):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=depth)
+        self.error = None
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is self._STOP:
+                    return
+                if self.error is None:
+                    self.sink.write(*item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def write(self, frame, img):
+        self._check()
+        self.queue.put((frame, img))
+
+    def flush(self):
+        '''
+        Wait until all frames in flight are written.
+        '''
+        self.queue.join()
+        self._check()
+
+    def close(self):
+        if self.worker.is_alive():
+            self.queue.put(self._STOP)
+            self.worker.join()
+        self.sink.close()
+        self._check()
+
+
+class PooledSink(FrameSink):
+    '''
+    Forward frames to another sink on a pool of workers, frames are
+    written concurrently, in no particular order.
+
+    Suitable for sinks writing each frame independently, like
+    :class:`FileSink`, whose compression would stall the main loop.
+
+    :parameter sink: (FrameSink)
+        Specify the sink to forward frames to.
+
+    :parameter workers: (int)
+        Specify the number of workers.
+
+    :parameter depth: (int)
+        Specify the max number of frames in flight. When workers fall
+        behind, ``write`` blocks until a slot is free (backpressure).
+
+    :parameter processes: (boolean)
+        If true, use a process pool instead of a thread pool, the sink
+        must be picklable.
+    '''
+    def __init__(self, sink, workers=4, depth=16, processes=False):
+        import concurrent.futures as cf
+
+        self.sink = sink
+        if processes:
+            self.pool = cf.ProcessPoolExecutor(workers)
+        else:
+            self.pool = cf.ThreadPoolExecutor(workers)
+        self.slots = threading.BoundedSemaphore(depth)
+        self.futures = set()
+
+    def _done(self, future):
+        self.slots.release()
+
+    def _check(self):
+        for future in [f for f in self.futures if f.done()]:
+            self.futures.remove(future)
+            future.result()
+
+    def write(self, frame, img):
+        self._check()
+        self.slots.acquire()
+        future = self.pool.submit(self.sink.write, frame, img)
+        future.add_done_callback(self._done)
+        self.futures.add(future)
+
+    def flush(self):
+        '''
+        Wait until all frames in flight are written.
+        '''
+        for future in list(self.futures):
+            future.exception()  # wait
+        self._check()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.sink.close()
+        self._check()
+
+
+class VideoSink(FrameSink):
+    '''
+    Stream frames into a long-lived ``ffmpeg`` process, encoding the video
+    incrementally instead of saving and converting images at exit.
+
+    :parameter path: (string)
+        Specify the output path without extension, e.g. ``'/tmp/video'``.
+
+    :parameter formats: (list of string)
+        Specify the output formats, ``'mp4'`` and / or ``'gif'``. All formats
+        are encoded by the same ``ffmpeg`` process.
+
+    :parameter framerate: (int)
+        Specify the frame rate of output video.
+
+    :note:
+        Writing is synchronous, wrap with :class:`PipelinedSink` to encode
+        on a background thread, as ``Animation.set_output_video`` does.
+
+    :note:
+        A GIF palette can only be computed after the last frame, so GIF
+        frames are streamed into a lossless temporary video, and converted
+        with a two-pass palette on ``close``. Memory use stays bounded on
+        long runs, at the cost of the temporary video on disk.
+    '''
+    def __init__(self, path, formats=('mp4', ), framerate=24, ffmpeg='ffmpeg'):
+        self.path = path
+        self.formats = list(formats)
+        self.framerate = framerate
+        self.ffmpeg = ffmpeg
+        self.proc = None
+        self.log = None
+        self.size = None
+        self.tmpdir = None
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def get_output_filename(self, ext):
+        return f'{self.path}.{ext}'
+
+    def _command(self, width, height):
+        cmd = [
+            self.ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo',
+            '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-framerate',
+            str(self.framerate), '-i', '-'
+        ]
+        for ext in self.formats:
+            if ext == 'mp4':
+                cmd += [
+                    '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec',
+                    'libx264', '-pix_fmt', 'yuv420p',
+                    self.get_output_filename(ext)
+                ]
+            elif ext == 'gif':
+                cmd += ['-vcodec', 'ffv1', self._intermediate()]
+            else:
+                raise ValueError(f'Unsupported video format: {ext}')
+        return cmd
+
+    def _intermediate(self):
+        return os.path.join(self.tmpdir, 'gif.mkv')
+
+    def _run(self, cmd):
+        import subprocess
+
+        ret = subprocess.call(cmd, stdin=subprocess.DEVNULL, stderr=self.log)
+        if ret != 0:
+            raise RuntimeError(f'ffmpeg exited with {ret}: {self._error()}')
+
+    def _error(self):
+        self.log.seek(0)
+        return self.log.read().decode(errors='replace')
+
+    def _make_gif(self):
+        # Pass 1 computes the palette of the whole video, pass 2 applies it:
+        video = self._intermediate()
+        palette = os.path.join(self.tmpdir, 'palette.png')
+        base = [self.ffmpeg, '-y', '-loglevel', 'error', '-i', video]
+        self._run(base + ['-vf', 'palettegen', palette])
+        self._run(base + [
+            '-i', palette, '-lavfi', 'paletteuse',
+            self.get_output_filename('gif')
+        ])
+
+    def write(self, frame, img):
+        import subprocess
+        import tempfile
+
+        img = _to_pixels(img)
+        if self.proc is None:
+            self.size = img.shape[1], img.shape[0]
+            # A pipe nobody reads until exit could fill up and block ffmpeg:
+            self.log = tempfile.TemporaryFile()
+            if 'gif' in self.formats:
+                self.tmpdir = tempfile.mkdtemp()
+            self.proc = subprocess.Popen(self._command(*self.size),
+                                         stdin=subprocess.PIPE,
+                                         stderr=self.log)
+        if (img.shape[1], img.shape[0]) != self.size:
+            raise ValueError(f'Frame size {img.shape[1]}x{img.shape[0]} '
+                             f'differs from video size {self.size}')
+        self.proc.stdin.write(img.tobytes())
+
+    def close(self):
+        import shutil
+
+        if self.proc is None:
+            return
+        proc, self.proc = self.proc, None
+        try:
+            proc.stdin.close()
+            ret = proc.wait()
+            if ret != 0:
+                raise RuntimeError(f'ffmpeg exited with {ret}: '
+                                   f'{self._error()}')
+            if self.tmpdir is not None:
+                self._make_gif()
+        finally:
+            self.log.close()
+            if self.tmpdir is not None:
+                shutil.rmtree(self.tmpdir, ignore_errors=True)
+                self.tmpdir = None
@@ -4,6 +4,7 @@ Display images or animations using Taichi GUI (WIP)
 
 import taichi as ti
 import taichi_glsl as ts
+import numpy as np
 import time
 import os
 
@@ -116,39 +117,83 @@ class Animation(ts.DataOriented):
         self.has_input = False
         self.auto_clean = False
         self.colormap = None
+        self._display = None
+        self.gpu_circles = True
+        self.notebook_res = None
+        self.notebook_fps = 30
+        self.mpl_fps = 60
+        self._notebook = None
+        self._host_frame = None
+        self._notebook_img = None
+        self._circle_rasterizer = None
         self.screenshot_dir = None
-        self.output_video = None
+        self.screenshot_format = 'png'
+        self._screenshot_writer = None
+        self.video_writer = None
+        self.frame_sink = None
+        self.input_script = None
+        self.max_frames = None
+        self.fixed_dt = None
+        self.substeps = 1
+        self.frame_skip = False
+        self.max_substeps = 8
+        self.render_every = 1
+        self.steps = 0
+        self.profiler = None
+        self.record_input = None
+        self.ensemble = None
+        self._mosaic = None
+        self.target_fps = None
+        self.min_render_scale = 0.25
+        self.render_scale = 1.0
+        self._upscaled = None
+        self._last_frame_time = None
+        self._frame_time = None
+        self._interactive_scale = 1.0
+        self._idle_frames = 0
+        self._last_mouse = None
+        self._recorder = None
+        self.profiler_hud = False
+        self._accumulator = 0.0
+        self._last_wall_time = None
         self.gui_backend = os.environ.get('TI_GUI_BACKEND', 'native')
         self.start_time = time.time()
         self._resolution = res
         self.on_init(**kwargs)
 
-    def set_output_video(self, path, framerate=24):
+    def set_output_video(self, path, framerate=24, queue_size=16):
         '''
         Export frames painted in GUI to a video.
 
-        FIXME: Only work for ``self.img`` render, doesn't work for ``self.circles`` for now.
-        Use ``self.screenshot_dir = '/tmp'``, then ``cd /tmp && ti video`` if you wish to.
+        Frames are streamed into an ``ffmpeg`` process on a background
+        thread, so that the video is encoded while the animation runs, and
+        exiting only has to flush the remaining frames.
+
+        :parameter path: (string)
+            Specify the output path, ending with ``.gif`` or ``.mp4``.
+            If neither, both ``path.gif`` and ``path.mp4`` are exported.
+
+        :parameter queue_size: (int)
+            Specify the max number of frames waiting to be encoded. The
+            main loop blocks when the encoder falls behind.
+
+        :note:
+            ``self.circles`` are only exported when ``self.gpu_circles`` is
+            enabled (by default).
         '''
-        output_dir = os.path.dirname(path)
         output_file = os.path.basename(path)
         try:
             output_ext = output_file.split(os.path.extsep)[-1]
             assert output_ext in ['gif', 'mp4']
         except:
             output_ext = None
-        self.video_manager = ti.VideoManager(output_dir,
-                                             framerate=framerate,
-                                             automatic_build=False)
-        self.video_manager.taichi_glsl_output_ext = output_ext
-
-        def _get_output_filename(suffix):
-            if output_ext is not None:
-                return path[:-(len(output_ext) + 1)] + suffix
-            else:
-                return path + suffix
-
-        self.video_manager.get_output_filename = _get_output_filename
+        if output_ext is not None:
+            path = path[:-(len(output_ext) + 1)]
+            formats = [output_ext]
+        else:
+            formats = ['gif', 'mp4']
+        encoder = ts.VideoSink(path, formats, framerate=framerate)
+        self.video_writer = ts.PipelinedSink(encoder, depth=queue_size)
 
     def on_init(self):
         '''
@@ -156,31 +201,102 @@ class Animation(ts.DataOriented):
 
         Set up self.* properties for application usage here:
 
-        +--------------------+--------------+-----------------+-------------------------------+
-        | Property           | Type         | Default         | Description                   |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``img``            | ``np.array`` | ``None``        | Image to display.             |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``circles``        | ``np.array`` | ``None``        | Circles to paint.             |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``circle_radius``  |   scalar     | ``1``           | Radius of circles.            |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``circle_color``   |   RGB hex    | ``0x000000``    | Color of circles.             |
-        +--------------------+--------------+-----------------+-------------------------------+
-        |``background_color``|   RGB hex    | ``0x000000``    | background color of window.   |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``title``          |   string     | ``"Animation"`` | Title of the window.          |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``screenshot_dir`` |   string     | ``None``        | Path to save screenshots.     |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``resolution``     |   tuple      | ``img.shape``   | The size of window / screen.  |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``auto_clean``     |   boolean    | ``False``       | Zero the image before render. |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``colormap``       |  MPL CMap    | ``None``        | ``matplotlib.cm`` color map.  |
-        +--------------------+--------------+-----------------+-------------------------------+
-        | ``gui_backend``    |   string     | ``native``      | native, matplotlib, or none   |
-        +--------------------+--------------+-----------------+-------------------------------+
+        +---------------------+--------------+-----------------+-------------------------------+
+        | Property            | Type         | Default         | Description                   |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``img``             | ``np.array`` | ``None``        | Image to display.             |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``circles``         | ``np.array`` | ``None``        | Circles to paint.             |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``circle_radius``   |   scalar     | ``1``           | Radius of circles, or a field |
+        |                     |              |                 | of per-circle radius.         |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``circle_color``    |   RGB hex    | ``0x000000``    | Color of circles, or a field  |
+        |                     |              |                 | of per-circle RGB color.      |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``gpu_circles``     |   boolean    | ``True``        | Paint circles into the image  |
+        |                     |              |                 | on device, see                |
+        |                     |              |                 | ``ts.CircleRasterizer``.      |
+        +---------------------+--------------+-----------------+-------------------------------+
+        |``background_color`` |   RGB hex    | ``0x000000``    | background color of window.   |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``title``           |   string     | ``"Animation"`` | Title of the window.          |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``screenshot_dir``  |   string     | ``None``        | Path to save screenshots.     |
+        +---------------------+--------------+-----------------+-------------------------------+
+        |``screenshot_format``|   string     | ``png``         | ``png``, ``npy``, or ``raw``, |
+        |                     |              |                 | see ``ts.FileSink``. Always   |
+        |                     |              |                 | ``png`` with CPU circles or   |
+        |                     |              |                 | the profiler HUD.             |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``resolution``      |   tuple      | ``img.shape``   | The size of window / screen.  |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``target_fps``      |   scalar     | ``None``        | Lower the render resolution   |
+        |                     |              |                 | to hold this frame rate, see  |
+        |                     |              |                 | ``self.iRenderResolution``.   |
+        |                     |              |                 | Not supported with ensemble.  |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``min_render_scale``|   scalar     | ``0.25``        | Min ratio of render resolution|
+        |                     |              |                 | to ``self.resolution``.       |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``ensemble``        |   Ensemble   | ``None``        | Show the batched ``img`` as a |
+        |                     |              |                 | mosaic of all instances.      |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``auto_clean``      |   boolean    | ``False``       | Zero the image before render. |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``colormap``        |  MPL CMap    | ``None``        | ``matplotlib.cm`` color map,  |
+        |                     |              |                 | its name, or ``ColormapLUT``. |
+        |                     |              |                 | Baked into a ``ColormapLUT``  |
+        |                     |              |                 | when assigned.                |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``gui_backend``     |   string     | ``native``      | native, matplotlib, ipython,  |
+        |                     |              |                 | headless, or none             |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``notebook_res``    |   tuple      | ``None``        | Downscale to this resolution  |
+        |                     |              |                 | when ``ipython`` backend.     |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``notebook_fps``    |   scalar     | ``30``          | Max frame rate to send when   |
+        |                     |              |                 | ``ipython`` backend.          |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``mpl_fps``         |   scalar     | ``60``          | Max frame rate when           |
+        |                     |              |                 | ``matplotlib`` backend.       |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``frame_sink``      |  FrameSink   | ``None``        | Receive frames when headless. |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``input_script``    | ScriptedInput| ``None``        | Inputs to use when headless.  |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``record_input``    |   string     | ``None``        | Path to record inputs, see    |
+        |                     |              |                 | ``self.replay_input(path)``.  |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``max_frames``      |   int        | ``None``        | Stop after this many frames.  |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``fixed_dt``        |   scalar     | ``None``        | Time step of ``on_advance``,  |
+        |                     |              |                 | use wall-clock if ``None``.   |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``substeps``        |   int        | ``1``           | ``on_advance`` calls per      |
+        |                     |              |                 | displayed frame.              |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``frame_skip``      |   boolean    | ``False``       | Step by wall-clock instead of |
+        |                     |              |                 | ``substeps``, see below.      |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``max_substeps``    |   int        | ``8``           | Max steps per frame when      |
+        |                     |              |                 | ``frame_skip`` is enabled.    |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``render_every``    |   int        | ``1``           | Call ``on_render`` once every |
+        |                     |              |                 | this many displayed frames,   |
+        |                     |              |                 | and when render scale changes.|
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``profiler``        | FrameProfiler| ``None``        | Measure each stage of frames. |
+        +---------------------+--------------+-----------------+-------------------------------+
+        | ``profiler_hud``    |   boolean    | ``False``       | Show profiler stats on screen.|
+        +---------------------+--------------+-----------------+-------------------------------+
+
+        When ``fixed_dt`` is set, ``self.time`` and ``self.iTime`` advance by
+        exactly ``fixed_dt`` per ``on_advance``, regardless of the display
+        speed, which makes the simulation deterministic. If ``frame_skip``
+        is also enabled, the number of steps per frame is decided by the
+        elapsed wall-clock time (up to ``max_substeps``), so that the
+        simulation keeps real-time speed while rendering falls behind.
         '''
         pass
 
@@ -247,12 +363,137 @@ class Animation(ts.DataOriented):
     def on_escape(self):
         self.on_close()
 
+    @property
+    def colormap(self):
+        '''
+        (PS, ColormapLUT, RW) Get or set the color map applied to
+        ``self.img``. A ``matplotlib`` color map or its name is baked into a
+        ``ts.ColormapLUT`` on assignment, so that its fields are allocated
+        before any kernel runs.
+        '''
+        return self._colormap
+
+    @colormap.setter
+    def colormap(self, value):
+        if value is not None and not isinstance(value, ts.ColormapLUT):
+            value = ts.ColormapLUT(value)
+        self._colormap = value
+
+    def _allocate_fields(self):
+        # Allocate all the fields used for display up front, before
+        # ``on_start`` runs any kernel, rather than lazily in the main loop:
+        img = self.img
+        if img is not None and self.ensemble is not None:
+            if self._mosaic is None:
+                self._mosaic = self.ensemble.mosaic_field(img)
+        elif img is not None and self.target_fps is not None:
+            if self._upscaled is None:
+                if hasattr(img, 'n'):
+                    self._upscaled = ti.Vector.field(img.n, img.dtype,
+                                                     img.shape)
+                else:
+                    self._upscaled = ti.field(img.dtype, img.shape)
+        if self.colormap is not None or (self.circles is not None
+                                         and self.gpu_circles):
+            if self._display is None:
+                self._display = ti.Vector.field(3, ti.f32, self.resolution)
+        if self.circles is not None and self.gpu_circles:
+            if self._circle_rasterizer is None:
+                self._circle_rasterizer = ts.CircleRasterizer(
+                    self.resolution, self.circles.shape[0])
+        if self.gui_backend == 'ipython' and self.notebook_res is not None:
+            if self._notebook_img is None:
+                self._notebook_img = ti.Vector.field(3, ti.f32,
+                                                     self.notebook_res)
+
+    @ti.kernel
+    def _blit_display(self, src: ti.template()):
+        for I in ti.grouped(self._display):
+            self._display[I] = ts.vec3(src[I])
+
+    @ti.kernel
+    def _clear_display(self, r: ti.f32, g: ti.f32, b: ti.f32):
+        for I in ti.grouped(self._display):
+            self._display[I] = ts.vec(r, g, b)
+
+    @ti.kernel
+    def _upscale(self, src: ti.template(), w: ti.i32, h: ti.i32):
+        # Bilinearly stretch the rendered ``[0, w) x [0, h)`` corner:
+        scale = ts.vec(w, h) / ts.vec(*self._upscaled.shape)
+        for I in ti.grouped(self._upscaled):
+            p = (I + 0.5) * scale - 0.5
+            lo = ts.clamp(int(ti.floor(p)), 0, ts.vec(w, h) - 1)
+            hi = min(lo + 1, ts.vec(w, h) - 1)
+            f = ts.clamp(p - lo, 0.0, 1.0)
+            a = src[lo.x, lo.y] * (1 - f.x) + src[hi.x, lo.y] * f.x
+            b = src[lo.x, hi.y] * (1 - f.x) + src[hi.x, hi.y] * f.x
+            self._upscaled[I] = a * (1 - f.y) + b * f.y
+
+    def _adapt_render_scale(self, events):
+        '''
+        Update ``self.render_scale`` from the duration of last frame.
+
+        While over the frame budget of ``self.target_fps``, the number of
+        rendered pixels is scaled down proportionally; once the inputs have
+        been idle (no events and a still cursor) for a few frames, it's
+        refined progressively back to full resolution. As soon as inputs
+        resume, the scale drops back to the last one that held the budget,
+        instead of timing the (slow) refined frames.
+        '''
+        now = time.time()
+        last, self._last_frame_time = self._last_frame_time, now
+        mouse, self._last_mouse = self._last_mouse, self.mouse
+        if self.target_fps is None:
+            self.render_scale = 1.0
+            return
+        if last is None:
+            return
+        idle = not events and mouse == self._last_mouse
+        if idle:
+            self._idle_frames += 1
+            if self._idle_frames > 2:
+                self.render_scale = min(1.0, self.render_scale * 2)
+            return
+        self._idle_frames = 0
+        if self.render_scale != self._interactive_scale:
+            self.render_scale = self._interactive_scale
+            return
+        budget = 1 / self.target_fps
+        elapsed = max(now - last, 1e-6)
+        if elapsed > budget * 1.1 or elapsed < budget * 0.7:
+            # Render cost is roughly proportional to the number of pixels:
+            factor = min(max((budget / elapsed)**0.5, 0.8), 1.25)
+            self.render_scale = min(
+                max(self.render_scale * factor, self.min_render_scale), 1.0)
+        self._interactive_scale = self.render_scale
+
     @property
     def _img(self):
+        '''
+        The image field to display, with color map and circles applied.
+        '''
+        img = self.img
+        if img is not None and self.ensemble is not None:
+            self.ensemble.mosaic(img, self._mosaic)
+            img = self._mosaic
+        elif img is not None and self.render_scale < 1:
+            self._upscale(img, *self.render_resolution)
+            img = self._upscaled
+        display = self._display
         if self.colormap is not None:
-            return self.colormap(self.img.to_numpy())
-        else:
-            return self.img
+            self.colormap.apply(img, display)
+            img = display
+        if self.circles is not None and self.gpu_circles:
+            if img is None:
+                self._clear_display(
+                    *ts.painting._hex_to_rgb(self.background_color))
+            elif img is not display:
+                self._blit_display(img)
+            self._circle_rasterizer.paint(display, self.circles,
+                                          self.circle_radius,
+                                          self.circle_color)
+            img = display
+        return img
 
     def on_pre_event(self):
         '''
@@ -284,84 +525,196 @@ class Animation(ts.DataOriented):
         pass
 
     def on_pre_exit(self):
-        if hasattr(self, 'video_manager'):
-            ext = self.video_manager.taichi_glsl_output_ext
-            ti.info('Saving result to {}.{}',
-                    self.video_manager.get_output_filename(''), ext
-                    or 'gif and mp4')
-            self.video_manager.make_video(gif=(not ext or ext == 'gif'),
-                                          mp4=(not ext or ext == 'mp4'))
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+        if self._screenshot_writer is not None:
+            self._screenshot_writer.close()
+            self._screenshot_writer = None
+        if self.video_writer is not None:
+            encoder = self.video_writer.sink
+            ti.info('Saving result to {}.{}', encoder.path,
+                    ' and '.join(encoder.formats))
+            self.video_writer.close()
+            self.video_writer = None
 
     def on_exit(self):
         pass
 
-    def define_input(self):
+    def define_input(self, capacity=32):
         '''
         Should be called if you wish to use ``self.iXXX`` as uniform scalars.
 
         If you are familiar with `Shadertoy <https://shadertoy.com>`_, then this is for you :)
+
+        All the inputs are packed into two uniform blocks (1D float32 and
+        int32 fields), each uploaded to device by one transfer, and only
+        when any of its values changed. ``iTime`` and ``iFrame``, which
+        change every frame, are written by a kernel instead, so that the
+        blocks stay clean while there is no input. Add your own uniforms
+        into the blocks with :meth:`define_uniform`.
+
+        :parameter capacity: (int)
+            Specify the number of scalars each uniform block could hold.
         '''
-        self._iTime = ti.field(ti.f32, ())
-        self._iFrame = ti.field(ti.i32, ())
-        self._iMouse = ti.Vector.field(2, ti.f32, ())
-        self._iMouseButton = ti.Vector.field(3, ti.i32, ())
-        self._iKeyDirection = ti.Vector.field(2, ti.f32, ())
+        self._iBlock = ti.field(ti.f32, capacity)
+        self._iBlockInt = ti.field(ti.i32, capacity)
+        self._uniform_host = {
+            ti.f32: np.zeros(capacity, dtype=np.float32),
+            ti.i32: np.zeros(capacity, dtype=np.int32),
+        }
+        self._uniform_uploaded = {ti.f32: None, ti.i32: None}
+        self._uniform_layout = {}
+        self._uniform_updaters = {}
         self.has_input = True
+        self.define_uniform('iTime')
+        self.define_uniform('iFrame', dtype=ti.i32)
+        self.define_uniform('iMouse', 2)
+        self.define_uniform('iMouseButton', 3, ti.i32)
+        self.define_uniform('iKeyDirection', 2)
+        self.define_uniform('iRenderResolution', 2, ti.i32)
+
+    def define_uniform(self, name, n=1, dtype=ti.f32, update=None):
+        '''
+        Add a custom uniform into the uniform block, should be called after
+        :meth:`define_input`.
+
+        :parameter name: (string)
+            Specify the name of uniform, used in :meth:`uniform` and
+            :meth:`set_uniform`.
+
+        :parameter n: (int)
+            Specify the number of components, 1 for a scalar, otherwise a
+            ``n``-D vector.
+
+        :parameter dtype: (DataType)
+            Specify ``ti.f32`` or ``ti.i32``.
+
+        :parameter update: (callable)
+            If specified, ``update()`` is called per frame to get the new
+            value, otherwise the value changes only by :meth:`set_uniform`.
+
+        For example::
+
+            def on_init(self):
+                ...
+                self.define_input()
+                self.define_uniform('iGravity', 2)
+                self.set_uniform('iGravity', (0, -9.8))
+
+            @ti.kernel
+            def on_advance(self):
+                for i in self.vel:
+                    self.vel[i] += self.uniform('iGravity') * self.dt
+        '''
+        if not self.has_input:
+            raise Exception('Call ``self.define_input()`` before '
+                            '``self.define_uniform()``')
+        if name in self._uniform_layout:
+            raise KeyError(f'Uniform {name} already defined')
+        if dtype not in [ti.f32, ti.i32]:
+            raise TypeError(f'Unsupported uniform type: {dtype}')
+        offset = sum(m for _, m, t in self._uniform_layout.values()
+                     if t == dtype)
+        if offset + n > self._uniform_host[dtype].shape[0]:
+            raise ValueError(f'Uniform block full, specify a larger '
+                             f'``capacity`` in ``self.define_input()``')
+        self._uniform_layout[name] = offset, n, dtype
+        if update is not None:
+            self._uniform_updaters[name] = update
+
+    def set_uniform(self, name, value):
+        '''
+        Set the value of a uniform, uploaded to device before next frame.
+        '''
+        offset, n, dtype = self._uniform_layout[name]
+        self._uniform_host[dtype][offset:offset + n] = value
+
+    def uniform(self, name):
+        '''
+        (TS, scalar or vector, RO) Get the value of a uniform.
+        '''
+        if not self.has_input:
+            raise Exception(
+                'Add ``self.define_input()`` to ``on_init`` if you '
+                'wish to use inputs')
+        offset, n, dtype = self._uniform_layout[name]
+        if ti.inside_kernel():
+            block = self._iBlockInt if dtype == ti.i32 else self._iBlock
+            ret = [ti.subscript(block, offset + i) for i in range(n)]
+        else:
+            conv = int if dtype == ti.i32 else float
+            host = self._uniform_host[dtype]
+            ret = [conv(x) for x in host[offset:offset + n]]
+        if n == 1:
+            return ret[0]
+        return ti.Vector(ret)
+
+    def _upload_uniforms(self):
+        for dtype, block in [(ti.f32, self._iBlock),
+                             (ti.i32, self._iBlockInt)]:
+            host = self._uniform_host[dtype]
+            uploaded = self._uniform_uploaded[dtype]
+            if uploaded is not None and np.array_equal(host, uploaded):
+                continue
+            block.from_numpy(host)
+            self._uniform_uploaded[dtype] = host.copy()
+
+    @ti.kernel
+    def _upload_clock(self, time: ti.f32, frame: ti.i32):
+        # ``iTime`` and ``iFrame`` are the first uniforms of their blocks:
+        self._iBlock[0] = time
+        self._iBlockInt[0] = frame
+
+    def _update_clock(self):
+        t, frame = self.time, self.frame
+        self._upload_clock(t, frame)
+        # Keep the host copies in sync, without dirtying the blocks:
+        for host in self._uniform_host, self._uniform_uploaded:
+            if host[ti.f32] is not None:
+                host[ti.f32][0] = t
+            if host[ti.i32] is not None:
+                host[ti.i32][0] = frame
 
     def on_update_input(self):
         if not self.has_input:
             return
-        self._iTime[None] = self.time
-        self._iFrame[None] = self.frame
-        self._iMouse[None] = self.mouse
-        ip = lambda *x: int(self.gui.is_pressed(*x))
-        lmb, mmb, rmb = ip(ti.GUI.LMB), ip(ti.GUI.MMB), ip(ti.GUI.RMB)
-        self._iMouseButton[None] = [lmb, mmb, rmb]
+        pressed = self.gui.key_pressed
+        ip = lambda *keys: int(any(key in pressed for key in keys))
+        self._update_clock()
+        self.set_uniform('iMouse', self.mouse)
+        self.set_uniform(
+            'iMouseButton',
+            [ip(ti.GUI.LMB), ip(ti.GUI.MMB),
+             ip(ti.GUI.RMB)])
         dx = ip('d', ti.GUI.RIGHT) - ip('a', ti.GUI.LEFT)
         dy = ip('w', ti.GUI.UP) - ip('s', ti.GUI.DOWN)
-        self._iKeyDirection[None] = [dx, dy]
+        self.set_uniform('iKeyDirection', [dx, dy])
+        self.set_uniform('iRenderResolution', self.render_resolution)
+        for name, update in self._uniform_updaters.items():
+            self.set_uniform(name, update())
+        self._upload_uniforms()
 
     @property
     def iTime(self):
         '''
         (TS, float32, RO) Current time in seconds.
         '''
-        if not self.has_input:
-            raise Exception(
-                'Add ``self.define_input()`` to ``on_init`` if you '
-                'wish to use inputs')
-        if ti.inside_kernel():
-            return ti.subscript(self._iTime, None)
-        else:
-            return self._iTime[None]
+        return self.uniform('iTime')
 
     @property
     def iFrame(self):
         '''
         (TS, int32, RO) Current frame number start from 0.
         '''
-        if not self.has_input:
-            raise Exception(
-                'Add ``self.define_input()`` to ``on_init`` if you '
-                'wish to use inputs')
-        if ti.inside_kernel():
-            return ti.subscript(self._iFrame, None)
-        else:
-            return self._iFrame[None]
+        return self.uniform('iFrame')
 
     @property
     def iMouse(self):
         '''
         (TS, 2D float32 vector, RO) Current mouse position from 0 to 1.
         '''
-        if not self.has_input:
-            raise Exception(
-                'Add ``self.define_input()`` to ``on_init`` if you '
-                'wish to use inputs')
-        if ti.inside_kernel():
-            return self._iMouse.subscript(None)
-        else:
-            return self._iMouse[None]
+        return self.uniform('iMouse')
 
     @property
     def iMouseButton(self):
@@ -373,14 +726,7 @@ class Animation(ts.DataOriented):
         ``self.iMouseButton[2]`` is ``1`` if RMB is pressed.
         Otherwise, ``0``.
         '''
-        if not self.has_input:
-            raise Exception(
-                'Add ``self.define_input()`` to ``on_init`` if you '
-                'wish to use inputs')
-        if ti.inside_kernel():
-            return self._iMouseButton.subscript(None)
-        else:
-            return self._iMouseButton[None]
+        return self.uniform('iMouseButton')
 
     @property
     def iKeyDirection(self):
@@ -392,14 +738,7 @@ class Animation(ts.DataOriented):
         If W or up arrow is pressed, then ``self.iKeyDirection`` is ``vec(0.0, 1.0)``.
         If S or down arrow is pressed, then ``self.iKeyDirection`` is ``vec(0.0, -1.0)``.
         '''
-        if not self.has_input:
-            raise Exception(
-                'Add ``self.define_input()`` to ``on_init`` if you '
-                'wish to use inputs')
-        if ti.inside_kernel():
-            return self._iKeyDirection.subscript(None)
-        else:
-            return self._iKeyDirection[None]
+        return self.uniform('iKeyDirection')
 
     @property
     def iResolution(self):
@@ -408,6 +747,40 @@ class Animation(ts.DataOriented):
         '''
         return self.resolution
 
+    @property
+    def iRenderResolution(self):
+        '''
+        (TS, 2D int32 vector, RO) Resolution to render at in this frame.
+
+        Equals to ``self.iResolution`` unless ``self.target_fps`` is set.
+        To support adaptive resolution, ``on_render`` should only fill the
+        ``self.iRenderResolution`` sized corner of ``self.img``, which is
+        then stretched to the whole window, e.g.::
+
+            def on_init(self):
+                self.img = ti.Vector.field(3, ti.f32, (512, 512))
+                self.target_fps = 30
+                self.define_input()
+
+            @ti.kernel
+            def on_render(self):
+                res = self.iRenderResolution
+                for i, j in ti.ndrange(res.x, res.y):
+                    uv = (ts.vec(i, j) + 0.5) / res
+                    self.img[i, j] = expensive_shading(uv)
+        '''
+        return self.uniform('iRenderResolution')
+
+    @property
+    def render_resolution(self):
+        '''
+        (PS, tuple of two int, RO) Get the resolution to render at, i.e.
+        ``self.resolution`` scaled by ``self.render_scale``.
+        '''
+        w, h = self.resolution
+        s = self.render_scale
+        return max(1, min(w, round(w * s))), max(1, min(h, round(h * s)))
+
     def on_event(self, e):
         '''
         Called when a event occurred, hook me if you want a raw event control.
@@ -451,6 +824,8 @@ class Animation(ts.DataOriented):
         '''
         (PS, tuple of two int, RW) Get or set window size / screen resolution.
         '''
+        if self.img is not None and self.ensemble is not None:
+            return self.ensemble.mosaic_res(self.img.shape)
         if self.img is not None:
             return self.img.shape()[0:2]
         else:
@@ -463,8 +838,14 @@ class Animation(ts.DataOriented):
     @property
     def time(self):
         '''
-        (PS, float32, RO) Get current time in seconds.
+        (PS, float32, RO) Get current time in seconds, read once per frame.
         '''
+        if self.fixed_dt is not None:
+            return self.steps * self.fixed_dt
+        if isinstance(self.gui, ts.HeadlessGUI) and self.gui.time is not None:
+            return self.gui.time  # replaying
+        if self._frame_time is not None:
+            return self._frame_time
         return time.time() - self.start_time
 
     @property
@@ -475,72 +856,280 @@ class Animation(ts.DataOriented):
         return self.gui.frame
 
     def _show_mpl_animation(self):
-        import numpy as np
+        import itertools
         import matplotlib.pyplot as plt
         from matplotlib.animation import FuncAnimation
 
-        fig = plt.figure(figsize=(4, 4))
-        fim = plt.figimage(
-            np.zeros((*self.resolution, 3), dtype=np.float32) + 0.5)
+        w, h = self.resolution
+        dpi = 100
+        fig = plt.figure(figsize=(w / dpi, h / dpi), dpi=dpi)
+        fig.canvas.manager.set_window_title(self.title)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_axis_off()
+        # Taichi images are indexed by (x, y) with y pointing up:
+        im = ax.imshow(np.zeros((h, w, 3), dtype=np.float32),
+                       origin='lower',
+                       interpolation='nearest',
+                       animated=True)
 
         def update(frame):
-            img = self._per_loop(do_get_img=True)[:, :, :3]
-            fim.set_array(img)
-            return fim,
-
-        anim = FuncAnimation(fig, update, frames=50, interval=1)
+            if not self.gui.running:
+                plt.close(fig)
+                return im,
+            img = self._per_loop(do_get_img=True)
+            if img.ndim == 2:
+                img = img[:, :, None]
+            if img.shape[2] == 1:
+                img = np.repeat(img, 3, axis=2)
+            im.set_data(np.clip(img[:, :, :3].swapaxes(0, 1), 0, 1))
+            if self.max_frames is not None and self.frame >= self.max_frames:
+                self.gui.running = False
+                plt.close(fig)
+            return im,
+
+        if self.max_frames is None:
+            frames = itertools.count()
+        else:
+            frames = range(self.frame, self.max_frames)
+        self._mpl_animation = FuncAnimation(fig,
+                                            update,
+                                            frames=frames,
+                                            interval=1000 / self.mpl_fps,
+                                            repeat=False,
+                                            blit=True,
+                                            cache_frame_data=False)
         plt.show()
+        self._mpl_animation = None
+
+    def _get_substeps(self):
+        if isinstance(self.gui, ts.HeadlessGUI) and self.gui.steps is not None:
+            return self.gui.steps  # replaying
+        if self.fixed_dt is None or not self.frame_skip:
+            return self.substeps
+        now = time.time()
+        if self._last_wall_time is not None:
+            self._accumulator += now - self._last_wall_time
+        self._last_wall_time = now
+        steps = int(self._accumulator / self.fixed_dt)
+        self._accumulator -= steps * self.fixed_dt
+        if steps > self.max_substeps:
+            # Too far behind, drop the remaining lag instead of spiraling:
+            steps = self.max_substeps
+            self._accumulator = 0.0
+        return steps
+
+    def _advance_clock(self):
+        self.steps += 1
+        if self.fixed_dt is not None and self.has_input:
+            self._update_clock()
+
+    def replay_input(self, path):
+        '''
+        Replay inputs recorded by ``self.record_input = path`` without any
+        window, with the recorded time and number of steps per frame, so
+        that a session could be benchmarked or bisected reproducibly::
+
+            animation = MyAnimation()
+            animation.profiler = ts.FrameProfiler()
+            animation.replay_input('/tmp/session.tsir')
+            print(animation.profiler.report())
+
+        :parameter path: (string)
+            Specify the path of input record.
+        '''
+        self.input_script = ts.InputReplay(path)
+        self.max_frames = len(self.input_script)
+        self.gui_backend = 'headless'
+        self.start()
+
+    def _make_gui(self):
+        if self.gui_backend == 'headless':
+            return ts.HeadlessGUI(self.title,
+                                  self.resolution,
+                                  background_color=self.background_color,
+                                  sink=self.frame_sink,
+                                  script=self.input_script,
+                                  max_frames=self.max_frames)
+        return ti.GUI(self.title,
+                      self.resolution,
+                      background_color=self.background_color,
+                      show_gui=(self.gui_backend == 'native'))
 
     def start(self):
         '''
         Call me when GUI is ready to start shows up.
 
         A common usage for application can be: ``MyAnimation().start()``.
+
+        With ``self.gui_backend = 'headless'``, no window is created: each
+        frame is sent to ``self.frame_sink`` and inputs are taken from
+        ``self.input_script``, e.g.::
+
+            animation = MyAnimation()
+            animation.gui_backend = 'headless'
+            animation.frame_sink = ts.PipelinedSink(
+                ts.FileSink('/tmp/frames/{:06d}.npy'))
+            animation.max_frames = 1000
+            animation.start()
         '''
+        if self.ensemble is not None and self.target_fps is not None:
+            raise ValueError('``self.target_fps`` is not supported with '
+                             '``self.ensemble``')
+        self._allocate_fields()
         self.on_start()
-        with ti.GUI(self.title,
-                    self.resolution,
-                    background_color=self.background_color,
-                    show_gui=(self.gui_backend == 'native')) as self.gui:
+        if self.record_input is not None:
+            self._recorder = ts.InputRecorder(self.record_input)
+        self._last_wall_time = None
+        self._last_frame_time = None
+        self._interactive_scale = self.render_scale
+        self._rendered_scale = None
+        self._idle_frames = 0
+        self._accumulator = 0.0
+        with self._make_gui() as self.gui:
             if self.gui_backend == 'matplotlib':
                 self._show_mpl_animation()
             else:
                 while self.gui.running:
                     self._per_loop()
+                    if self.max_frames is not None and \
+                            self.frame >= self.max_frames:
+                        self.gui.running = False
+        self._frame_time = None
         self.on_pre_exit()
         self.on_exit()
         self.gui = None
 
+    @ti.kernel
+    def _downsample_notebook(self, src: ti.template()):
+        scale = ts.vec(*src.shape) / ts.vec(*self._notebook_img.shape)
+        for I in ti.grouped(self._notebook_img):
+            lo = int(I * scale)
+            hi = max(lo + 1, int((I + 1) * scale))
+            acc = ts.vec3(0.0)
+            for x in range(lo.x, hi.x):
+                for y in range(lo.y, hi.y):
+                    acc += ts.vec3(src[x, y])
+            self._notebook_img[I] = acc / ((hi - lo).x * (hi - lo).y)
+
+    def _show_notebook(self, display, canvas_only):
+        if self._notebook is None:
+            self._notebook = ts.NotebookDisplay(max_fps=self.notebook_fps)
+        if not self._notebook.ready():
+            return
+        if display is None or canvas_only:
+            img = self.gui.get_image()
+        elif self.notebook_res is None or \
+                tuple(self.notebook_res) == tuple(self.resolution):
+            img = self._host_image(display)
+        else:
+            self._downsample_notebook(display)
+            img = self._notebook_img.to_numpy()
+        self._notebook.show(img)
+
+    def _host_image(self, display):
+        # Read the display back at most once per frame, shared by the
+        # notebook, ``get_image``, screenshots and video:
+        if self._host_frame is None:
+            self._host_frame = display.to_numpy()
+        return self._host_frame
+
+    def _stage(self, name):
+        if self.profiler is None:
+            return _NoProfile()
+        return self.profiler.scope(name)
+
     def _per_loop(self, do_get_img=False):
-        self.on_pre_event()
-        for e in self.gui.get_events():
-            self.on_event(e)
-        self.on_update_input()
-        self.on_advance()
-        self.on_pre_render()
-        self.on_render()
-        self.on_post_render()
-        if self.img is not None:
-            self.gui.set_image(self._img)
-        if self.circles is not None:
-            self.gui.circles(self.circles.to_numpy(), self.circle_color,
-                             self.circle_radius)
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+        # Read the wall clock once per frame, so that ``iTime`` and the
+        # time recorded for replay are the same value:
+        self._frame_time = None
+        self._frame_time = self.time
+        with self._stage('events'):
+            if self._recorder is not None:
+                frame = self.frame
+                pos, keys = self.mouse, list(self.gui.key_pressed)
+            self.on_pre_event()
+            events = self.gui.get_events()
+            for e in events:
+                self.on_event(e)
+            self._adapt_render_scale(events)
+            self.on_update_input()
+        with self._stage('on_advance'):
+            steps = self._get_substeps()
+            if self._recorder is not None:
+                self._recorder.record(frame, self._frame_time, steps, pos,
+                                      keys, events)
+            for _ in range(steps):
+                self.on_advance()
+                self._advance_clock()
+        # The corner rendered at another scale can't be upscaled anymore:
+        rescaled = self.render_scale != self._rendered_scale
+        if self.frame % self.render_every == 0 or rescaled:
+            with self._stage('on_render'):
+                self.on_pre_render()
+                self.on_render()
+                self.on_post_render()
+            self._rendered_scale = self.render_scale
+        with self._stage('compose'):
+            display = self._img
+        self._host_frame = None
+        # CPU circles and the HUD are only painted on the GUI canvas:
+        canvas_only = (self.circles is not None and not self.gpu_circles
+                       or self.profiler is not None and self.profiler_hud)
+        # The canvas of these backends is never shown, only fill it when
+        # something is painted on it:
+        offscreen = self.gui_backend in ['ipython', 'matplotlib']
+        if display is not None and (canvas_only or not offscreen):
+            with self._stage('set_image'):
+                self.gui.set_image(display)
+        if self.circles is not None and not self.gpu_circles:
+            with self._stage('circles'):
+                self.gui.circles(self.circles.to_numpy(),
+                                 radius=self.circle_radius,
+                                 color=self.circle_color)
+        if self.profiler is not None and self.profiler_hud:
+            self.profiler.draw_hud(self.gui)
         if self.gui_backend == 'ipython':
-            from IPython.display import clear_output
-            clear_output(wait=True)
-            img = self.gui.get_image()[:, :, :3]
-            ti.imdisplay(img)
+            with self._stage('ipython'):
+                self._show_notebook(display, canvas_only)
         if do_get_img:
-            img = self.gui.get_image()
+            with self._stage('get_image'):
+                if display is not None and not canvas_only:
+                    img = self._host_image(display)
+                else:
+                    img = self.gui.get_image()
         self.on_show()
-        if self.screenshot_dir is None:
-            self.gui.show()
-        else:
-            self.gui.show(f'{self.screenshot_dir}/{self.frame:06d}.png')
-        if hasattr(self, 'video_manager'):
-            self.video_manager.write_frame(self.img.to_numpy())
+        frame = self.frame
+        screenshot_display = display is not None and not canvas_only
+        with self._stage('show'):
+            if self.screenshot_dir is None or screenshot_display:
+                self.gui.show()
+            else:
+                self.gui.show(f'{self.screenshot_dir}/{frame:06d}.png')
+        if self.screenshot_dir is not None and screenshot_display:
+            with self._stage('screenshot'):
+                if self._screenshot_writer is None:
+                    self._screenshot_writer = ts.PooledSink(
+                        ts.FileSink(f'{self.screenshot_dir}/{{:06d}}.'
+                                    f'{self.screenshot_format}'))
+                self._screenshot_writer.write(frame, self._host_image(display))
+        if self.video_writer is not None and display is not None:
+            with self._stage('video'):
+                self.video_writer.write(self.gui.frame,
+                                        self._host_image(display))
             ti.debug('Frame {} recorded', self.gui.frame)
+        if self.profiler is not None:
+            self.profiler.end_frame()
         if do_get_img:
             return img
         else:
             return None
+
+
+class _NoProfile:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
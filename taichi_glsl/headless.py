@@ -0,0 +1,265 @@
+'''
+Headless (offscreen) GUI backend for ``ts.Animation``.
+'''
+
+import taichi as ti
+import numpy as np
+
+
+class HeadlessEvent:
+    '''
+    A GUI event produced by scripts, mimicking ``ti.GUI.Event``.
+    '''
+    def __init__(self, type, key, pos=(0.0, 0.0), delta=(0, 0)):
+        self.type = type
+        self.key = key
+        self.pos = tuple(pos)
+        self.delta = tuple(delta)
+        self.modifier = []
+
+    def __repr__(self):
+        return f'HeadlessEvent({self.type!r}, {self.key!r}, {self.pos!r})'
+
+
+class ScriptedInput:
+    '''
+    Scripted mouse & keyboard source for the headless GUI backend.
+
+    :parameter script: (dict or callable)
+        Either ``script[frame]`` or ``script(frame)`` specifies the input
+        of a frame, as a dict with optional items:
+
+        * ``'pos'``: cursor position, from 0 to 1.
+        * ``'keys'``: collection of keys being pressed.
+        * ``'events'``: list of ``(type, key[, pos[, delta]])`` tuples, e.g.
+          ``(ti.GUI.PRESS, ti.GUI.LMB)``.
+        * ``'time'``: value of ``Animation.time`` in this frame.
+        * ``'steps'``: number of ``on_advance`` calls in this frame.
+
+        Frames not mentioned in the script keep the previous cursor and
+        pressed keys. PRESS / RELEASE events update the pressed keys too,
+        once fetched by ``get_events``, like ``ti.GUI`` does.
+
+    For example::
+
+        script = ts.ScriptedInput({
+            0: {'pos': (0.5, 0.5)},
+            10: {'events': [(ti.GUI.PRESS, ti.GUI.LMB)]},
+            20: {'events': [(ti.GUI.RELEASE, ti.GUI.LMB)]},
+        })
+    '''
+    def __init__(self, script=None):
+        self.script = script if script is not None else {}
+        self.pos = (0.0, 0.0)
+        self.keys = set()
+        self.time = None
+        self.steps = None
+
+    def _lookup(self, frame):
+        if callable(self.script):
+            return self.script(frame)
+        return self.script.get(frame)
+
+    def at(self, frame):
+        '''
+        Update cursor & pressed keys to the given frame.
+
+        :return:
+            The list of events happened at this frame.
+        '''
+        entry = self._lookup(frame) or {}
+        self.time = entry.get('time')
+        self.steps = entry.get('steps')
+        if 'pos' in entry:
+            self.pos = tuple(entry['pos'])
+        if 'keys' in entry:
+            self.keys = set(entry['keys'])
+        events = []
+        for e in entry.get('events', ()):
+            if not isinstance(e, HeadlessEvent):
+                type, key, *rest = e
+                if not rest:
+                    rest = [self.pos]
+                e = HeadlessEvent(type, key, *rest)
+            events.append(e)
+        return events
+
+    def apply(self, e):
+        '''
+        Update pressed keys according to a fetched event.
+        '''
+        if e.type == ti.GUI.PRESS:
+            self.keys.add(e.key)
+        elif e.type == ti.GUI.RELEASE:
+            self.keys.discard(e.key)
+
+
+class HeadlessGUI:
+    '''
+    A window-less stand-in of ``ti.GUI`` used by ``ts.Animation`` when
+    ``self.gui_backend = 'headless'``.
+
+    Nothing is drawn or converted unless needed: the image passed to
+    ``set_image`` is only copied to host when there is a sink, a file to
+    save, or ``get_image`` is called.
+
+    :parameter sink: (FrameSink)
+        Specify the sink to receive finished frames, see :mod:`taichi_glsl.framesink`.
+
+    :parameter script: (ScriptedInput)
+        Specify the source of mouse & keyboard inputs.
+
+    :parameter max_frames: (int)
+        Stop running after this many frames if specified.
+    '''
+    def __init__(self,
+                 name='Headless',
+                 res=(512, 512),
+                 background_color=0x000000,
+                 sink=None,
+                 script=None,
+                 max_frames=None):
+        if isinstance(res, int):
+            res = (res, res)
+        self.name = name
+        self.res = tuple(res)
+        self.background_color = background_color
+        self.sink = sink
+        self.script = script if script is not None else ScriptedInput()
+        self.max_frames = max_frames
+        self.running = max_frames != 0
+        self.frame = 0
+        self.img = None
+        self.events = self.script.at(self.frame)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    @property
+    def key_pressed(self):
+        return self.script.keys
+
+    def is_pressed(self, *keys):
+        for key in keys:
+            if key in self.script.keys:
+                return True
+        return False
+
+    def get_cursor_pos(self):
+        return self.script.pos
+
+    @property
+    def time(self):
+        '''
+        Scripted time of current frame, ``None`` if not specified.
+        '''
+        return self.script.time
+
+    @property
+    def steps(self):
+        '''
+        Scripted number of steps of current frame, ``None`` if not specified.
+        '''
+        return self.script.steps
+
+    def get_events(self, *types):
+        if types:
+            ret = [e for e in self.events if e.type in types]
+            self.events = [e for e in self.events if e.type not in types]
+        else:
+            ret, self.events = self.events, []
+        for e in ret:
+            self.script.apply(e)
+        return ret
+
+    def get_event(self, *types):
+        for i, e in enumerate(self.events):
+            if not types or e.type in types:
+                self.event = self.events.pop(i)
+                self.script.apply(e)
+                return True
+        return False
+
+    def set_image(self, img):
+        self.img = img
+
+    def circles(self, pos, radius=1, color=0xffffff):
+        '''
+        Paint antialiased circles over the current image, on host, the same
+        way ``ts.CircleRasterizer`` does on device.
+
+        :parameter pos: (numpy array)
+            Specify the centers of circles, of shape ``(n, 2)``, from 0 to 1.
+
+        :parameter radius: (scalar or numpy array)
+            Specify the radius of circles in pixels.
+
+        :parameter color: (RGB hex or numpy array of RGB hex)
+            Specify the color of circles.
+        '''
+        pos = np.asarray(pos, dtype=np.float32).reshape(-1, 2)
+        n = pos.shape[0]
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float32), n)
+        color = np.broadcast_to(np.asarray(color, dtype=np.uint32), n)
+        color = np.stack([color >> 16, color >> 8, color], axis=1) & 0xff
+        color = color.astype(np.float32) / 255
+        # Paint on a copy, ``set_image`` may have been given user's array:
+        img = self._to_numpy().astype(np.float32)
+        if img.ndim == 2:
+            img = np.stack([img] * 3, axis=2)
+        w, h = img.shape[:2]
+        for (x, y), r, c in zip(pos * (w, h), radius, color):
+            x0, y0 = max(int(x - r - 1), 0), max(int(y - r - 1), 0)
+            x1, y1 = min(int(x + r + 2), w), min(int(y + r + 2), h)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            px = np.arange(x0, x1) + 0.5 - x
+            py = np.arange(y0, y1) + 0.5 - y
+            d = np.hypot(px[:, None], py[None, :]) - r
+            a = np.clip(0.5 - d, 0, 1)[:, :, None]
+            block = img[x0:x1, y0:y1, :3]
+            block += (c - block) * a
+        self.img = img
+
+    def text(self, *args, **kwargs):
+        pass
+
+    def _to_numpy(self):
+        img = self.img
+        if img is None:
+            return np.zeros((*self.res, 3), dtype=np.float32)
+        if not isinstance(img, np.ndarray):
+            img = img.to_numpy()
+        return img
+
+    def get_image(self):
+        '''
+        Get the current image as a ``(width, height, 4)`` float32 array.
+        '''
+        img = self._to_numpy().astype(np.float32)
+        if img.ndim == 2:
+            img = np.stack([img] * 3, axis=2)
+        if img.shape[2] < 4:
+            alpha = np.ones((*img.shape[:2], 4 - img.shape[2]), np.float32)
+            img = np.concatenate([img, alpha], axis=2)
+        return img
+
+    def show(self, file=None):
+        if self.sink is not None or file is not None:
+            img = self._to_numpy()
+            if self.sink is not None:
+                self.sink.write(self.frame, img)
+            if file is not None:
+                ti.imwrite(img, file)
+        self.frame += 1
+        if self.max_frames is not None and self.frame >= self.max_frames:
+            self.running = False
+        self.events = self.script.at(self.frame)
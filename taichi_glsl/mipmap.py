@@ -0,0 +1,142 @@
+'''
+Mipmap pyramids of fields, for prefiltered level-of-detail sampling.
+'''
+
+import taichi as ti
+import taichi_glsl as ts
+
+from .sampling import bilerp, trilerp
+
+
+@ti.data_oriented
+class MipPyramid:
+    '''
+    A mip pyramid of a 2D or 3D field, each level is half the size of the
+    previous one, down to a single element.
+
+    Level ``0`` is the base field itself, other levels are box-filtered
+    level by level, see :meth:`build` and :meth:`update`.
+    Sample it with :func:`textureLod`.
+
+    :parameter base: (2D or 3D Tensor)
+        Specify the field to prefilter, scalar or vector.
+
+    :parameter levels: (int, optional)
+        Specify the number of levels including the base, default to a
+        complete pyramid.
+
+    For example::
+
+        img = ti.Vector.field(3, ti.f32, (1024, 1024))
+        mip = ts.MipPyramid(img)
+        ...
+        mip.build()
+
+        @ti.kernel
+        def render():
+            for I in ti.grouped(screen):
+                uv = (I + 0.5) / ts.vec(*screen.shape)
+                screen[I] = ts.textureLod(mip, uv, zoom_lod)
+    '''
+    def __init__(self, base, levels=None):
+        self.dim = len(base.shape)
+        if self.dim not in [2, 3]:
+            raise ValueError('Only 2D and 3D fields are supported')
+        if levels is None:
+            # ceil(log2(size)) halvings, to reach one element for any size:
+            levels = (max(base.shape) - 1).bit_length() + 1
+        self.base = base
+        self.levels = [base]
+        shape = tuple(base.shape)
+        for l in range(1, levels):
+            shape = tuple(max(1, (n + 1) // 2) for n in shape)
+            if hasattr(base, 'n'):
+                self.levels.append(ti.Vector.field(base.n, base.dtype, shape))
+            else:
+                self.levels.append(ti.field(base.dtype, shape))
+
+    @ti.func
+    def _reduce(self, src: ti.template(), dst: ti.template(), I):
+        acc = dst[I] * 0
+        for o in ti.static(ti.grouped(ti.ndrange(*[2] * self.dim))):
+            # Odd sizes: the last parent repeats its edge child:
+            acc += src[min(I * 2 + o, ti.Vector(src.shape) - 1)]
+        dst[I] = acc / 2**self.dim
+
+    @ti.kernel
+    def _downsample(self, src: ti.template(), dst: ti.template(), lo0: ti.i32,
+                    lo1: ti.i32, lo2: ti.i32, hi0: ti.i32, hi1: ti.i32,
+                    hi2: ti.i32):
+        if ti.static(self.dim == 2):
+            for i, j in ti.ndrange((lo0, hi0), (lo1, hi1)):
+                self._reduce(src, dst, ti.Vector([i, j]))
+        else:
+            for i, j, k in ti.ndrange((lo0, hi0), (lo1, hi1), (lo2, hi2)):
+                self._reduce(src, dst, ti.Vector([i, j, k]))
+
+    def build(self):
+        '''
+        Rebuild all the levels from the base field.
+        '''
+        self.update((0, ) * self.dim, self.base.shape)
+
+    def update(self, lo, hi):
+        '''
+        Rebuild only the parts of levels covering a changed box of base.
+
+        :parameter lo: (tuple of int)
+            Specify the lower corner (inclusive) of the changed box.
+
+        :parameter hi: (tuple of int)
+            Specify the upper corner (exclusive) of the changed box.
+        '''
+        lo, hi = list(lo), list(hi)
+        for src, dst in zip(self.levels, self.levels[1:]):
+            lo = [a // 2 for a in lo]
+            hi = [min((b + 1) // 2, n) for b, n in zip(hi, dst.shape)]
+            pad = [0] * (3 - self.dim)
+            self._downsample(src, dst, *lo, *pad, *hi, *pad)
+
+
+@ti.func
+def textureLod(pyramid: ti.template(), P, lod):
+    '''
+    Sample a mip pyramid at a level of detail, with trilinear filtering:
+    bilinear (or trilinear for 3D) in the two nearest levels, and linear
+    across them.
+
+    :parameter pyramid: (MipPyramid)
+        Specify the pyramid to sample.
+
+    :parameter P: (Vector of float)
+        Specify the normalized coordinate from 0 to 1, as in GLSL.
+
+    :parameter lod: (float)
+        Specify the level of detail, ``0`` for the base, ``1`` for half the
+        resolution, and so on. Usually ``log2`` of the footprint of a
+        sample in base texels, e.g. ``log2(dx * base.shape[0])``.
+
+    :return:
+        The filtered value, costs two interpolated samples, whatever the
+        footprint is.
+    '''
+    n = ti.static(len(pyramid.levels))
+    lod = ts.clamp(lod, 0.0, n - 1.0)
+    l0 = int(lod)
+    f = lod - l0
+    lo = pyramid.base[P.cast(int) * 0] * 0.0
+    hi = lo
+    for l in ti.static(range(n)):
+        level = ti.static(pyramid.levels[l])
+        if l == l0 or l == min(l0 + 1, n - 1):
+            Q = P * ti.Vector(level.shape) - 0.5
+            val = lo
+            if ti.static(pyramid.dim == 2):
+                val = bilerp(level, Q)
+            else:
+                val = trilerp(level, Q)
+            if l == l0:
+                lo = val
+            if l == min(l0 + 1, n - 1):
+                hi = val
+    return lo + (hi - lo) * f
@@ -0,0 +1,83 @@
+'''
+Display animations in Jupyter notebook through a persistent image widget.
+'''
+
+import time
+import zlib
+
+from .framesink import _to_pixels
+
+
+class NotebookDisplay:
+    '''
+    Send frames to a single ``ipywidgets.Image`` as compressed images,
+    instead of replacing the notebook output per frame.
+
+    Used by ``ts.Animation`` when ``self.gui_backend = 'ipython'``.
+    Requires ``ipywidgets`` and ``Pillow``.
+
+    :parameter max_fps: (scalar)
+        Specify the max frame rate to send, frames coming faster than
+        that are dropped, see :meth:`ready`.
+
+    :parameter format: (string)
+        Specify ``'jpeg'`` (smaller, lossy) or ``'png'`` (lossless).
+
+    :parameter quality: (int)
+        Specify the JPEG quality from 1 to 95.
+    '''
+    def __init__(self, max_fps=30, format='jpeg', quality=85):
+        self.max_fps = max_fps
+        self.format = format
+        self.quality = quality
+        self.widget = None
+        self.last_time = None
+        self.last_digest = None
+        self.sent = 0
+        self.skipped = 0
+
+    def ready(self):
+        '''
+        Check if it's time to send a new frame according to ``max_fps``,
+        call me before reading back the image to save the transfer.
+        '''
+        if self.max_fps is None or self.last_time is None:
+            return True
+        return time.time() - self.last_time >= 1 / self.max_fps
+
+    def _encode(self, img):
+        import io
+        from PIL import Image
+
+        buf = io.BytesIO()
+        if self.format == 'jpeg':
+            Image.fromarray(img).save(buf, 'jpeg', quality=self.quality)
+        else:
+            Image.fromarray(img).save(buf, 'png', compress_level=1)
+        return buf.getvalue()
+
+    def show(self, img):
+        '''
+        Send a frame to the widget, identical frames are skipped.
+
+        :parameter img: (numpy array)
+            The frame, of the same layout as ``field.to_numpy()``.
+        '''
+        self.last_time = time.time()
+        img = _to_pixels(img)
+        digest = zlib.crc32(img.tobytes()), img.shape
+        if digest == self.last_digest:
+            self.skipped += 1
+            return
+        self.last_digest = digest
+        data = self._encode(img)
+        if self.widget is None:
+            import ipywidgets
+            from IPython.display import display
+
+            self.widget = ipywidgets.Image(format=self.format,
+                                           width=img.shape[1],
+                                           height=img.shape[0])
+            display(self.widget)
+        self.widget.value = data
+        self.sent += 1
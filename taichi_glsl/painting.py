@@ -48,3 +48,170 @@ def paintArrow(img: ti.template(),
         c1 = ts.smoothstep(abs(sdLine(J, J + D1, P)), width, width / 2)
         c2 = ts.smoothstep(abs(sdLine(J, J + D2, P)), width, width / 2)
         ti.atomic_max(img[P], max(c0, c1, c2) * color)
+
+
+def _hex_to_rgb(color):
+    return tuple((color >> s & 0xff) / 255 for s in [16, 8, 0])
+
+
+def _fetch(value, i):
+    # Constant (0-D field) or per-circle value, branched at compile-time.
+    if len(value.shape) == 0:
+        return ti.subscript(value, None)
+    return ti.subscript(value, i)
+
+
+@ti.data_oriented
+class CircleRasterizer:
+    '''
+    Paint antialiased circles into an image field, on device.
+
+    The image is divided into tiles of ``tile_size`` pixels, circles are
+    first binned into the tiles they overlap, then each pixel only tests
+    the circles in its own tile, so that dense particle sets stay fast.
+
+    :parameter res: (tuple of int)
+        Specify the resolution of images to paint on.
+
+    :parameter n: (int)
+        Specify the max number of circles to paint.
+
+    :parameter tile_size: (int)
+        Specify the size of tiles in pixels.
+
+    :parameter tile_capacity: (int, optional)
+        Specify the max number of circles per tile, ``n`` by default.
+        Tile lists take ``tile_capacity`` integers per tile, and are
+        allocated once here, as fields can't be allocated once kernels
+        ran. With a smaller capacity than ``n``, :meth:`paint` reads the
+        tile counts back every call, and raises ``RuntimeError`` when a
+        tile overflows instead of dropping circles.
+
+    Overlapping circles are blended in the order of their indices, i.e.
+    circle ``i + 1`` is painted over circle ``i``.
+
+    For example::
+
+        raster = ts.CircleRasterizer((512, 512), pos.shape[0])
+        ...
+        raster.paint(img, pos, radius=2, color=0xffffff)
+
+    Where ``radius`` and ``color`` could also be per-circle fields, of
+    scalar and of 3D vector respectively.
+    '''
+    def __init__(self, res, n, tile_size=16, tile_capacity=None):
+        self.res = tuple(res)
+        self.n = n
+        self.tile_size = tile_size
+        if tile_capacity is None or tile_capacity > n:
+            tile_capacity = n
+        self.tile_capacity = tile_capacity
+        self.tiles = tuple((n + tile_size - 1) // tile_size for n in res)
+        self.tile_count = ti.field(ti.i32, self.tiles)
+        self.tile_list = ti.field(ti.i32, (*self.tiles, tile_capacity))
+        self.max_count = ti.field(ti.i32, ())
+        self.radius = ti.field(ti.f32, ())
+        self.color = ti.Vector.field(3, ti.f32, ())
+        self._uploaded = None
+
+    @ti.kernel
+    def _bin(self, pos: ti.template(), radius: ti.template()):
+        tile_list = ti.static(self.tile_list)
+        capacity = ti.static(self.tile_capacity)
+        for I in ti.grouped(self.tile_count):
+            self.tile_count[I] = 0
+        res = ts.vec(*self.res)
+        ntiles = ts.vec(*self.tiles)
+        for i in pos:
+            c = pos[i] * res
+            r = _fetch(radius, i) + 1
+            lo = max(0, int(ti.floor((c - r) / self.tile_size)))
+            hi = min(ntiles - 1, int(ti.floor((c + r) / self.tile_size)))
+            for x in range(lo.x, hi.x + 1):
+                for y in range(lo.y, hi.y + 1):
+                    k = ti.atomic_add(self.tile_count[x, y], 1)
+                    if k < capacity:
+                        tile_list[x, y, k] = i
+        if ti.static(capacity < self.n):
+            self.max_count[None] = 0
+            for I in ti.grouped(self.tile_count):
+                ti.atomic_max(self.max_count[None], self.tile_count[I])
+
+    @ti.kernel
+    def _sort(self):
+        # Binning fills the lists in no particular order, sort them by
+        # circle index so that overlapping colors blend deterministically:
+        tile_list = ti.static(self.tile_list)
+        capacity = ti.static(self.tile_capacity)
+        for x, y in self.tile_count:
+            n = min(self.tile_count[x, y], capacity)
+            for k in range(1, n):
+                i = tile_list[x, y, k]
+                j = k
+                while j > 0:
+                    if tile_list[x, y, j - 1] <= i:
+                        break
+                    tile_list[x, y, j] = tile_list[x, y, j - 1]
+                    j -= 1
+                tile_list[x, y, j] = i
+
+    @ti.kernel
+    def _paint(self, img: ti.template(), pos: ti.template(),
+               radius: ti.template(), color: ti.template()):
+        tile_list = ti.static(self.tile_list)
+        capacity = ti.static(self.tile_capacity)
+        res = ts.vec(*self.res)
+        for I in ti.grouped(img):
+            T = I // self.tile_size
+            p = I + 0.5
+            n = min(self.tile_count[T], capacity)
+            for k in range(n):
+                i = tile_list[T.x, T.y, k]
+                d = ts.distance(p, pos[i] * res) - _fetch(radius, i)
+                a = ts.clamp(0.5 - d)
+                if a > 0:
+                    img[I] = ts.mix(img[I], _fetch(color, i), a)
+
+    def paint(self, img, pos, radius=1, color=0xffffff):
+        '''
+        Paint circles into ``img``.
+
+        :parameter img: (3D vector Tensor)
+            Specify the image to paint on.
+
+        :parameter pos: (2D vector Tensor)
+            Specify the centers of circles, from 0 to 1, at most ``n``.
+
+        :parameter radius: (scalar or scalar Tensor)
+            Specify the radius of circles in pixels.
+
+        :parameter color: (RGB hex or 3D vector Tensor)
+            Specify the color of circles.
+        '''
+        if pos.shape[0] > self.n:
+            raise ValueError(f'Got {pos.shape[0]} circles, '
+                             f'rasterizer was created for {self.n}')
+        uniforms = (radius if isinstance(radius, (int, float)) else None,
+                    color if isinstance(color, int) else None)
+        if uniforms != self._uploaded:
+            if uniforms[0] is not None:
+                self.radius[None] = radius
+            if uniforms[1] is not None:
+                self.color[None] = _hex_to_rgb(color)
+            self._uploaded = uniforms
+        if uniforms[0] is not None:
+            radius = self.radius
+        if uniforms[1] is not None:
+            color = self.color
+        self._bin(pos, radius)
+        if self.tile_capacity < self.n:
+            # Only read back when a tile could overflow, as it syncs:
+            count = self.max_count[None]
+            if count > self.tile_capacity:
+                raise RuntimeError(
+                    f'{count} circles in a tile, more than tile_capacity='
+                    f'{self.tile_capacity}, please increase it')
+        if uniforms[1] is None:
+            # Blending circles of the same color is order-independent:
+            self._sort()
+        self._paint(img, pos, radius, color)
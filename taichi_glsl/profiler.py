@@ -0,0 +1,175 @@
+'''
+Per-stage frame profiler for ``ts.Animation`` main loop.
+'''
+
+import taichi as ti
+import numpy as np
+import collections
+import contextlib
+import time
+
+
+class FrameProfiler:
+    '''
+    Measure the time spent in each stage of a frame.
+
+    Keeps rolling min / mean / p95 statistics over the last ``window``
+    frames, and optionally a full per-frame trace for exporting.
+
+    :parameter window: (int)
+        Specify the number of latest frames used for statistics.
+
+    :parameter sync: (boolean)
+        If true, call ``ti.sync()`` at the end of each stage, so that
+        asynchronously launched kernels are counted in the stage launching
+        them rather than in a later one that happens to wait for them.
+
+    :parameter trace: (boolean)
+        If true, record every stage of every frame for :meth:`dump`.
+
+    For example::
+
+        class MyAnimation(ts.Animation):
+            def on_init(self):
+                ...
+                self.profiler = ts.FrameProfiler(trace=True)
+                self.profiler_hud = True
+
+            def on_exit(self):
+                print(self.profiler.report())
+                self.profiler.dump('/tmp/trace.json', format='chrome')
+    '''
+    def __init__(self, window=120, sync=True, trace=False):
+        self.window = window
+        self.sync = sync
+        self.trace = trace
+        self.samples = collections.OrderedDict()
+        self.events = []
+        self.frame = 0
+        self.origin = time.perf_counter()
+        self._frame_start = None
+
+    def _now(self):
+        if self.sync:
+            ti.sync()
+        return time.perf_counter()
+
+    def record(self, name, start, end):
+        '''
+        Record that stage ``name`` lasted from ``start`` to ``end`` (in
+        seconds, as returned by ``time.perf_counter()``).
+        '''
+        if name not in self.samples:
+            self.samples[name] = collections.deque(maxlen=self.window)
+        self.samples[name].append(end - start)
+        if self.trace:
+            self.events.append(
+                (self.frame, name, start - self.origin, end - start))
+
+    @contextlib.contextmanager
+    def scope(self, name):
+        '''
+        Measure the ``with`` block as stage ``name``, e.g.::
+
+            with profiler.scope('on_advance'):
+                self.on_advance()
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, self._now())
+
+    def begin_frame(self):
+        self._frame_start = self._now()
+
+    def end_frame(self):
+        if self._frame_start is not None:
+            self.record('frame', self._frame_start, self._now())
+            self._frame_start = None
+        self.frame += 1
+
+    def stats(self):
+        '''
+        Get rolling statistics of each stage.
+
+        :return:
+            A dict mapping stage names to dicts with ``min``, ``mean``,
+            ``p95`` and ``last`` durations in seconds.
+        '''
+        ret = collections.OrderedDict()
+        for name, samples in self.samples.items():
+            x = np.array(samples)
+            ret[name] = dict(min=x.min(),
+                             mean=x.mean(),
+                             p95=np.percentile(x, 95),
+                             last=x[-1])
+        return ret
+
+    def report(self):
+        '''
+        Format the statistics into a human-readable table, in milliseconds.
+        '''
+        lines = [f'{"stage":<16}{"min":>9}{"mean":>9}{"p95":>9}']
+        for name, s in self.stats().items():
+            lines.append(f'{name:<16}{s["min"] * 1e3:>9.3f}'
+                         f'{s["mean"] * 1e3:>9.3f}{s["p95"] * 1e3:>9.3f}')
+        return '\n'.join(lines)
+
+    def dump(self, path, format=None):
+        '''
+        Export the recorded trace, requires ``trace=True``.
+
+        :parameter path: (string)
+            Specify the output file path.
+
+        :parameter format: (string)
+            Specify ``'csv'``, ``'json'``, or ``'chrome'`` for the Chrome
+            trace format (open it in ``chrome://tracing`` or Perfetto).
+            Deduced from the extension of ``path`` if not specified.
+        '''
+        import json
+
+        if format is None:
+            format = 'csv' if path.endswith('.csv') else 'json'
+        if format == 'csv':
+            with open(path, 'w') as f:
+                f.write('frame,stage,start_ms,duration_ms\n')
+                for frame, name, start, dur in self.events:
+                    f.write(f'{frame},{name},{start * 1e3:.6f},'
+                            f'{dur * 1e3:.6f}\n')
+        elif format == 'json':
+            with open(path, 'w') as f:
+                json.dump([
+                    dict(frame=frame,
+                         stage=name,
+                         start_ms=start * 1e3,
+                         duration_ms=dur * 1e3)
+                    for frame, name, start, dur in self.events
+                ], f)
+        elif format == 'chrome':
+            events = []
+            for frame, name, start, dur in self.events:
+                events.append(
+                    dict(name=name,
+                         ph='X',
+                         ts=start * 1e6,
+                         dur=dur * 1e6,
+                         pid=0,
+                         tid=0,
+                         args=dict(frame=frame)))
+            with open(path, 'w') as f:
+                json.dump(dict(traceEvents=events), f)
+        else:
+            raise ValueError(f'Unsupported trace format: {format}')
+
+    def draw_hud(self, gui, pos=(0.02, 0.98), color=0xffffff):
+        '''
+        Draw the statistics as text onto a ``ti.GUI``.
+        '''
+        x, y = pos
+        for name, s in self.stats().items():
+            mean, p95 = s['mean'] * 1e3, s['p95'] * 1e3
+            text = f'{name}: {mean:.2f} ms (p95 {p95:.2f})'
+            gui.text(text, (x, y), font_size=14, color=color)
+            y -= 0.03
@@ -3,6 +3,7 @@ Pseudo-random number or noise generators.
 '''
 
 import taichi as ti
+import numpy as np
 import math
 
 
@@ -18,6 +19,9 @@ def rand():
         Depending on Taichi backend design, the generated random number
         may have the **same seed** on start up. And Taichi doesn't provide
         any way to set a random seed yet, so does Taichi GLSL.
+
+        The result also depends on how elements are scheduled to threads,
+        use :func:`hashRand` for numbers reproducible on any backend.
     '''
 
     return ti.random()
@@ -155,3 +159,302 @@ def randUnit3D():
     s = rand() * 2 - 1
     c = ti.sqrt(1 - s**2)
     return vec3(c * u, s)
+
+
+# Constants of the PCG hash, as two's complement int32 where needed:
+_PCG_MUL = 747796405
+_PCG_INC = 2891336453 - 2**32
+_PCG_OUT = 277803737
+
+
+@ti.func
+def _shr(x, s):
+    # Logical right shift of an int32, ``>>`` is arithmetic (sign-extends):
+    return (x >> s) & ((1 << (32 - s)) - 1)
+
+
+@ti.func
+def _pcg(v):
+    # The PCG hash on uint32, computed in wrapping int32 arithmetic, as
+    # unsigned shifts don't compile on every backend:
+    state = v * _PCG_MUL + _PCG_INC
+    word = (_shr(state, _shr(state, 28) + 4) ^ state) * _PCG_OUT
+    return _shr(word, 22) ^ word
+
+
+@ti.func
+def _hashKey(seed, I):
+    h = _pcg(ti.cast(seed, ti.i32))
+    if ti.static(isinstance(I, ti.Matrix)):
+        for d in ti.static(range(I.n)):
+            h = _pcg(h + ti.cast(I[d], ti.i32))
+    else:
+        h = _pcg(h + ti.cast(I, ti.i32))
+    return h
+
+
+@ti.func
+def _hashFloat(h):
+    # The top 24 bits, exactly representable in float32:
+    return ti.cast(_shr(h, 8), ti.f32) * (1 / 16777216)
+
+
+@ti.func
+def hashRand(seed, I, k=0):
+    '''
+    Generate a random floating number distributed evenly in range [0, 1),
+    as a pure function of ``(seed, I, k)``.
+
+    Unlike :func:`rand`, the result doesn't depend on thread scheduling,
+    backend or launch configuration, so Monte Carlo runs are reproducible
+    and comparable, and no random state is needed.
+
+    :parameter seed: (int)
+        Specify the seed of the whole stream.
+    :parameter I: (int or Vector of int)
+        Specify the element index, e.g. the loop index.
+    :parameter k: (int)
+        Specify the counter, e.g. the time step or the sample number, for
+        more numbers at the same element.
+
+    :return:
+        The return value is computed with the PCG hash::
+
+            h = pcg(seed)
+            for i in I:
+                h = pcg(h + i)
+            return (pcg(h + k) >> 8) / 2**24
+
+    For example::
+
+        @ti.kernel
+        def init(seed: ti.i32):
+            for i in pos:
+                pos[i] = ts.vec(ts.hashRand(seed, i, 0),
+                                ts.hashRand(seed, i, 1))
+    '''
+    return _hashFloat(_pcg(_hashKey(seed, I) + ti.cast(k, ti.i32)))
+
+
+@ti.func
+def hashRandND(n: ti.template(), seed, I, k=0):
+    '''
+    Generate a n-D random vector in a n-D cube ([0, 1)), see
+    :func:`hashRand`.
+
+    :note:
+        The components use counters ``k * n`` to ``k * n + n - 1``, so
+        increase ``k`` by one per vector.
+    '''
+    h = _hashKey(seed, I)
+    return ti.Vector([
+        _hashFloat(_pcg(h + ti.cast(k * n + c, ti.i32)))
+        for c in ti.static(range(n))
+    ])
+
+
+@ti.func
+def hashUnit2D(seed, I, k=0):
+    '''
+    Generate a 2-D random unit vector, see :func:`randUnit2D` and
+    :func:`hashRand`.
+    '''
+    a = hashRand(seed, I, k) * math.tau
+    return ti.Vector([ti.cos(a), ti.sin(a)])
+
+
+@ti.func
+def hashSolid2D(seed, I, k=0):
+    '''
+    Generate a 2-D random vector inside a unit circle, see
+    :func:`randSolid2D` and :func:`hashRand`.
+    '''
+    u = hashRandND(2, seed, I, k)
+    a = u.x * math.tau
+    return ti.Vector([ti.cos(a), ti.sin(a)]) * ti.sqrt(u.y)
+
+
+@ti.func
+def hashUnit3D(seed, I, k=0):
+    '''
+    Generate a 3-D random unit vector, see :func:`randUnit3D` and
+    :func:`hashRand`.
+    '''
+    u = hashRandND(2, seed, I, k)
+    a = u.x * math.tau
+    s = u.y * 2 - 1
+    c = ti.sqrt(1 - s**2)
+    return ti.Vector([c * ti.cos(a), c * ti.sin(a), s])
+
+
+@ti.func
+def _fillRand(seeded: ti.template(), seed, I, k):
+    u = 0.0
+    if ti.static(seeded):
+        u = hashRand(seed, I, k)
+    else:
+        u = ti.random()
+    return u
+
+
+@ti.kernel
+def _fillField(field: ti.template(), kind: ti.template(), nc: ti.template(),
+               seeded: ti.template(), seed: ti.i32, k: ti.i32, a: ti.ext_arr(),
+               b: ti.ext_arr()):
+    n = ti.static(max(nc, 1))
+    for I in ti.grouped(field):
+        v = ti.Vector.zero(ti.f32, n)
+        if ti.static(kind == 'range'):
+            for c in ti.static(range(n)):
+                u = _fillRand(seeded, seed, I, k + c)
+                v[c] = a[c] + u * (b[c] - a[c])
+        elif ti.static(kind == 'normal'):
+            # Box-Muller transform, two uniform numbers per component:
+            for c in ti.static(range(n)):
+                u = _fillRand(seeded, seed, I, k + 2 * c)
+                r = ti.sqrt(-2 * ti.log(1 - u))
+                t = _fillRand(seeded, seed, I, k + 2 * c + 1) * math.tau
+                v[c] = a[c] + b[c] * r * ti.cos(t)
+        elif ti.static(n == 2):
+            t = _fillRand(seeded, seed, I, k) * math.tau
+            r = b[0]
+            if ti.static(kind == 'solid2D'):
+                r *= ti.sqrt(_fillRand(seeded, seed, I, k + 1))
+            v = ti.Vector([a[0] + r * ti.cos(t), a[1] + r * ti.sin(t)])
+        else:
+            t = _fillRand(seeded, seed, I, k) * math.tau
+            s = _fillRand(seeded, seed, I, k + 1) * 2 - 1
+            r = b[0]
+            if ti.static(kind == 'solid3D'):
+                r *= _fillRand(seeded, seed, I, k + 2)**(1 / 3)
+            c = ti.sqrt(1 - s**2) * r
+            v = ti.Vector(
+                [a[0] + c * ti.cos(t), a[1] + c * ti.sin(t), a[2] + s * r])
+        if ti.static(nc == 0):
+            field[I] = v[0]
+        else:
+            field[I] = v
+
+
+_fillComponents = {'unit2D': 2, 'solid2D': 2, 'unit3D': 3, 'solid3D': 3}
+# Number of counters used per element, ``range`` and ``normal`` per component:
+_fillCounters = {
+    'range': 1,
+    'normal': 2,
+    'unit2D': 1,
+    'solid2D': 2,
+    'unit3D': 2,
+    'solid3D': 3
+}
+
+
+def _fill(field, kind, a, b, seed, step):
+    nc = getattr(field, 'n', 0)
+    if getattr(field, 'm', 1) != 1:
+        raise TypeError('Filling matrix fields is not supported')
+    if kind in _fillComponents and nc != _fillComponents[kind]:
+        raise TypeError(f'{kind} expects a field of '
+                        f'{_fillComponents[kind]} components, got {nc}')
+    a = np.broadcast_to(np.asarray(a, dtype=np.float32), max(nc, 1)).copy()
+    b = np.broadcast_to(np.asarray(b, dtype=np.float32), max(nc, 1)).copy()
+    seeded = seed is not None
+    k = _fillCounters[kind] * step
+    if kind in ['range', 'normal']:
+        k *= max(nc, 1)
+    _fillField(field, kind, nc, seeded, seed if seeded else 0, k, a, b)
+    return field
+
+
+def fillRange(field, a=0, b=1, seed=None, step=0):
+    '''
+    Fill a field with random numbers distributed evenly in range [a, b],
+    from Python-scope in one kernel launch, see :func:`randRange`.
+
+    :parameter field: (Tensor)
+        Specify the field to fill, scalar or vector.
+
+    :parameter a: (scalar or tuple)
+        Specify the start point of range, per component for vector fields.
+    :parameter b: (scalar or tuple)
+        Specify the end point of range, per component for vector fields.
+
+    :parameter seed: (int, optional)
+        If specified, fill with :func:`hashRand`, so that the result only
+        depends on ``seed``, ``step`` and the element indices, otherwise
+        with :func:`rand`.
+
+    :parameter step: (int)
+        Specify the step (e.g. the frame or iteration number) when filling
+        repeatedly with the same ``seed``, each step draws fresh numbers.
+        Step ``s`` uses the counters ``k`` from ``s * K`` to
+        ``s * K + K - 1``, where ``K`` is the number of random numbers per
+        element (one per component here), like :func:`hashRandND`.
+        Ignored without ``seed``.
+
+    :return:
+        The ``field`` itself.
+
+    For example::
+
+        pos = ti.Vector.field(2, ti.f32, 2**20)
+        ts.fillRange(pos, (0, 0), (1, 0.5), seed=233)
+    '''
+    return _fill(field, 'range', a, b, seed, step)
+
+
+def fillUniform(field, seed=None, step=0):
+    '''
+    Fill a field with random numbers distributed evenly in range [0, 1],
+    see :func:`fillRange`.
+    '''
+    return _fill(field, 'range', 0, 1, seed, step)
+
+
+def fillNormal(field, mean=0, std=1, seed=None, step=0):
+    '''
+    Fill a field with normally distributed random numbers, each component
+    is generated independently, see :func:`fillRange`.
+
+    :parameter mean: (scalar or tuple)
+        Specify the mean, per component for vector fields.
+    :parameter std: (scalar or tuple)
+        Specify the standard deviation, per component for vector fields.
+    '''
+    return _fill(field, 'normal', mean, std, seed, step)
+
+
+def fillUnit2D(field, center=0, radius=1, seed=None, step=0):
+    '''
+    Fill a 2-D vector field with points distributed evenly **on** a circle,
+    see :func:`randUnit2D` and :func:`fillRange`.
+
+    :parameter center: (scalar or tuple)
+        Specify the center of circle.
+    :parameter radius: (scalar)
+        Specify the radius of circle.
+    '''
+    return _fill(field, 'unit2D', center, radius, seed, step)
+
+
+def fillSolid2D(field, center=0, radius=1, seed=None, step=0):
+    '''
+    Fill a 2-D vector field with points distributed evenly **inside** a
+    circle, see :func:`randSolid2D` and :func:`fillUnit2D`.
+    '''
+    return _fill(field, 'solid2D', center, radius, seed, step)
+
+
+def fillUnit3D(field, center=0, radius=1, seed=None, step=0):
+    '''
+    Fill a 3-D vector field with points distributed evenly **on** a sphere,
+    see :func:`randUnit3D` and :func:`fillUnit2D`.
+    '''
+    return _fill(field, 'unit3D', center, radius, seed, step)
+
+
+def fillSolid3D(field, center=0, radius=1, seed=None, step=0):
+    '''
+    Fill a 3-D vector field with points distributed evenly **inside** a
+    sphere, see :func:`fillUnit3D`.
+    '''
+    return _fill(field, 'solid3D', center, radius, seed, step)
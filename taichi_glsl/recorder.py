@@ -0,0 +1,147 @@
+'''
+Record GUI inputs of ``ts.Animation`` into a compact binary file, and
+replay them headlessly for reproducible profiling.
+'''
+
+import taichi as ti
+import struct
+
+from .headless import ScriptedInput, HeadlessEvent
+
+_MAGIC = b'TSIR'
+_VERSION = 2
+# Chunk tags:
+_KEY = b'K'
+_FRAME = b'F'
+
+_HEADER = struct.Struct('<4sB')
+_KEY_DEF = struct.Struct('<HB')
+_FRAME_HEAD = struct.Struct('<idIffII')
+_EVENT = struct.Struct('<BHffff')
+
+
+def _event_types():
+    return [ti.GUI.PRESS, ti.GUI.RELEASE, ti.GUI.MOTION]
+
+
+class InputRecorder:
+    '''
+    Log the inputs of each frame to a binary file.
+
+    Each frame stores the time, the number of steps, the cursor position
+    and the keys pressed *before* fetching events, followed by the events
+    fetched in this frame. Key names are stored once in a key table.
+
+    Used by ``ts.Animation`` when ``self.record_input`` is set to a path.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(_HEADER.pack(_MAGIC, _VERSION))
+        self.key_ids = {}
+        self.types = _event_types()
+
+    def _key(self, key):
+        key = str(key)
+        if key not in self.key_ids:
+            kid = len(self.key_ids)
+            data = key.encode()
+            self.file.write(_KEY + _KEY_DEF.pack(kid, len(data)) + data)
+            self.key_ids[key] = kid
+        return self.key_ids[key]
+
+    def record(self, frame, time, steps, pos, keys, events):
+        '''
+        Record the inputs of a frame.
+
+        :parameter frame: (int)
+            The frame number.
+        :parameter time: (float)
+            The time of frame in seconds.
+        :parameter steps: (int)
+            The number of ``on_advance`` calls in this frame.
+        :parameter pos: (tuple of two float)
+            The cursor position before fetching events.
+        :parameter keys: (collection of keys)
+            The keys pressed before fetching events.
+        :parameter events: (list of events)
+            The events fetched in this frame.
+        '''
+        key_ids = [self._key(k) for k in keys]
+        events = [e for e in events if e.type in self.types]
+        event_data = [(self.types.index(e.type), self._key(e.key), *e.pos,
+                       *getattr(e, 'delta', (0, 0))) for e in events]
+        chunk = [
+            _FRAME,
+            _FRAME_HEAD.pack(frame, time, steps, *pos, len(key_ids),
+                             len(event_data))
+        ]
+        chunk.append(struct.pack(f'<{len(key_ids)}H', *key_ids))
+        chunk.extend(_EVENT.pack(*e) for e in event_data)
+        self.file.write(b''.join(chunk))
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def load_input_record(path):
+    '''
+    Load an input record written by :class:`InputRecorder`.
+
+    :return:
+        A dict mapping frame numbers to script entries, see :class:`ScriptedInput`.
+    '''
+    types = _event_types()
+    keys = {}
+    frames = {}
+    with open(path, 'rb') as f:
+        magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'{path} is not an input record of version '
+                             f'{_VERSION}')
+
+        def read(fmt):
+            return fmt.unpack(f.read(fmt.size))
+
+        while True:
+            tag = f.read(1)
+            if not tag:
+                break
+            if tag == _KEY:
+                kid, n = read(_KEY_DEF)
+                keys[kid] = f.read(n).decode()
+            elif tag == _FRAME:
+                frame, time, steps, x, y, nkeys, nevents = read(_FRAME_HEAD)
+                kids = struct.unpack(f'<{nkeys}H', f.read(2 * nkeys))
+                events = []
+                for _ in range(nevents):
+                    type, kid, px, py, dx, dy = read(_EVENT)
+                    events.append(
+                        HeadlessEvent(types[type], keys[kid], (px, py),
+                                      (dx, dy)))
+                frames[frame] = dict(time=time,
+                                     steps=steps,
+                                     pos=(x, y),
+                                     keys=[keys[k] for k in kids],
+                                     events=events)
+            else:
+                raise ValueError(f'Corrupted input record {path}')
+    return frames
+
+
+class InputReplay(ScriptedInput):
+    '''
+    Feed an input record back to the headless GUI backend.
+
+    Besides events, cursor and keys, the recorded time and number of steps
+    of each frame are replayed too, so that the workload is reproduced
+    exactly, see ``Animation.replay_input``.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.frames = load_input_record(path)
+        super().__init__(self.frames)
+
+    def __len__(self):
+        return max(self.frames) + 1 if self.frames else 0
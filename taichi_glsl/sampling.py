@@ -4,14 +4,83 @@ Some helper functions in processing fields & images.
 
 import taichi as ti
 import taichi_glsl as ts
+import numpy as np
+import functools
+import math
 
 from .odop import TaichiClass
 
 D = ts.vec(1, 0, -1)
 
+BOUNDARIES = ['clamp', 'wrap', 'mirror', 'border', 'assume_inside']
+
 
 @ti.func
-def sample(field: ti.template(), P):
+def boundaryIndex(shape, I, boundary: ti.template()):
+    '''
+    Map an integer index into the range of ``shape`` by a boundary mode.
+
+    :parameter shape: (Vector of int)
+        Specify the shape of the field.
+
+    :parameter I: (Vector of int)
+        Specify the index to map.
+
+    :parameter boundary: (string, compile-time)
+        Specify the boundary mode, one of:
+
+        * ``'clamp'``: clamp to the nearest edge element.
+        * ``'wrap'``: periodic, ``I % shape``.
+        * ``'mirror'``: mirrored repeat, e.g. ``-1`` maps to ``0``, ``-2`` to ``1``.
+        * ``'border'``: same as ``'clamp'``, the default value is applied
+          by the samplers, see :func:`sample`.
+        * ``'assume_inside'``: no-op, the caller guarantees that ``I`` is
+          inside (for interpolators, that all taps are inside), fastest
+          for interior-only loops.
+
+    :return:
+        The mapped index.
+    '''
+    ti.static_assert(ti.static(boundary in BOUNDARIES),
+                     'Unknown boundary mode')
+    ret = I
+    if ti.static(boundary == 'clamp' or boundary == 'border'):
+        ret = ts.clamp(I, 0, shape - 1)
+    elif ti.static(boundary == 'wrap'):
+        ret = I % shape
+    elif ti.static(boundary == 'mirror'):
+        m = I % (2 * shape)
+        ret = min(m, 2 * shape - 1 - m)
+    return ret
+
+
+@ti.func
+def _fetch(field: ti.template(), I, boundary: ti.template(), border):
+    shape = ti.Vector(field.shape)
+    ret = field[boundaryIndex(shape, I, boundary)]
+    if ti.static(boundary == 'border'):
+        if (I < 0).any() or (I >= shape).any():
+            ret = ret * 0 + border
+    return ret
+
+
+@ti.func
+def _floor(P, boundary: ti.template()):
+    I = int(P)
+    if ti.static(boundary != 'assume_inside'):
+        I = int(ti.floor(P * 1.0))  # ti.floor takes real components only
+    return I
+
+
+@ti.func
+def _lerp(a, b, t):
+    # One multiply-add per component, contracted into FMA where available:
+    return a + (b - a) * t
+
+
+@ti.func
+def sample(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
     '''
     Sampling a field with indices clampped into the field shape.
 
@@ -21,15 +90,27 @@ def sample(field: ti.template(), P):
     :parameter P: (Vector)
         Specify the index in field.
 
+    :parameter boundary: (string, compile-time)
+        Specify how to handle indices out of the field shape, see
+        :func:`boundaryIndex`. Default to ``'clamp'``.
+
+    :parameter border: (with the same type of field)
+        Specify the value out of the field shape in ``'border'`` mode.
+
     :return:
         The return value is calcuated as::
 
             P = clamp(P, 0, vec(*field.shape) - 1)
             return field[int(P)]
     '''
-    shape = ti.Vector(field.shape)
-    P = ts.clamp(P, 0, shape - 1)
-    return field[int(P)]
+    ret = field[int(P * 0)]
+    if ti.static(boundary == 'clamp'):
+        shape = ti.Vector(field.shape)
+        P = ts.clamp(P, 0, shape - 1)
+        ret = field[int(P)]
+    else:
+        ret = _fetch(field, _floor(P, boundary), boundary, border)
+    return ret
 
 
 @ti.func
@@ -50,14 +131,16 @@ def dflSample(field: ti.template(), P, dfl):
         The return value is calcuated as::
 
             return field[int(P)] if 0 <= P < vec(*field.shape) else dfl
+
+    :note:
+        Equivalent to ``sample(field, P, 'border', dfl)``.
     '''
-    shape = ti.Vector(field.shape)
-    inside = 0 <= P < shape
-    return field[int(P)] if inside else dfl
+    return sample(field, P, 'border', dfl)
 
 
 @ti.func
-def bilerp(field: ti.template(), P):
+def bilerp(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
     '''
     Bilinear sampling an 2D field with a real index.
 
@@ -67,14 +150,22 @@ def bilerp(field: ti.template(), P):
     :parameter P: (2D Vector of float)
         Specify the index in field.
 
+    :parameter boundary: (string, compile-time)
+        Specify how to handle elements out of the field shape, see
+        :func:`boundaryIndex`. Default to ``'clamp'``.
+
+    :parameter border: (with the same type of field)
+        Specify the value out of the field shape in ``'border'`` mode.
+
     :note:
-        If one of the element to be accessed is out of `field.shape`, then
-        `bilerp` will automatically do a clamp for you, see :func:`sample`. 
+        ``P`` is floored, not truncated, so that ``P`` in ``(-1, 0)``
+        interpolates the elements at ``-1`` and ``0``. Elements out of
+        `field.shape` are handled by ``boundary``, see :func:`sample`.
 
     :return:
         The return value is calcuated as::
 
-            I = int(P)
+            I = floor(P)
             x = fract(P)
             y = 1 - x
             return (sample(field, I + D.xx) * x.x * x.y +
@@ -84,17 +175,40 @@ def bilerp(field: ti.template(), P):
 
         .. where D = vec(1, 0, -1)
     '''
-    I = int(P)
-    x = ts.fract(P)
-    y = 1 - x
-    return (sample(field, I + D.xx) * x.x * x.y +
-            sample(field, I + D.xy) * x.x * y.y +
-            sample(field, I + D.yy) * y.x * y.y +
-            sample(field, I + D.yx) * y.x * x.y)
+    if ti.static(boundary == 'clamp'):
+        # Clamp P instead of the taps, so that truncating P floors it and
+        # only the upper neighbour needs another clamp:
+        shape = ti.Vector(field.shape)
+        P = ts.clamp(P, 0, shape - 1)
+        lo = int(P)
+        hi = min(lo + 1, shape - 1)
+        x = P - lo
+        y = 1 - x
+        return (field[hi.x, hi.y] * x.x * x.y + field[hi.x, lo.y] * x.x * y.y +
+                field[lo.x, lo.y] * y.x * y.y + field[lo.x, hi.y] * y.x * x.y)
+    elif ti.static(boundary == 'border'):
+        I = _floor(P, boundary)
+        x = P - I
+        y = 1 - x
+        return (_fetch(field, I + D.xx, boundary, border) * x.x * x.y +
+                _fetch(field, I + D.xy, boundary, border) * x.x * y.y +
+                _fetch(field, I + D.yy, boundary, border) * y.x * y.y +
+                _fetch(field, I + D.yx, boundary, border) * y.x * x.y)
+    else:
+        # Map the base index and its neighbour once, instead of per tap:
+        I = _floor(P, boundary)
+        x = P - I
+        shape = ti.Vector(field.shape)
+        lo = boundaryIndex(shape, I, boundary)
+        hi = boundaryIndex(shape, I + 1, boundary)
+        y = 1 - x
+        return (field[hi.x, hi.y] * x.x * x.y + field[hi.x, lo.y] * x.x * y.y +
+                field[lo.x, lo.y] * y.x * y.y + field[lo.x, hi.y] * y.x * x.y)
 
 
 @ti.func
-def trilerp(field: ti.template(), P):
+def trilerp(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
     '''
     Tilinear sampling an 3D field with a real index.
 
@@ -104,16 +218,23 @@ def trilerp(field: ti.template(), P):
     :parameter P: (3D Vector of float)
         Specify the index in field.
 
+    :parameter boundary: (string, compile-time)
+        Specify how to handle elements out of the field shape, see
+        :func:`boundaryIndex`. Default to ``'clamp'``.
+
+    :parameter border: (with the same type of field)
+        Specify the value out of the field shape in ``'border'`` mode.
+
     :note:
-        If one of the element to be accessed is out of `field.shape`, then
-        `Tilerp` will automatically do a clamp for you, see :func:`sample`.
+        ``P`` is floored, not truncated, see :func:`bilerp`. Elements out
+        of `field.shape` are handled by ``boundary``, see :func:`sample`.
 
         Syntax ref : https://en.wikipedia.org/wiki/Trilinear_interpolation.
 
     :return:
         The return value is calcuated as::
 
-            I = int(P)
+            I = floor(P)
             w0 = ts.fract(P)
             w1 = 1.0 - w0
             c00 = ts.sample(field, I + ts.D.yyy) * w1.x + ts.sample(field, I + ts.D.xyy) * w0.x
@@ -128,27 +249,986 @@ def trilerp(field: ti.template(), P):
 
         .. where D = vec(1, 0, -1)
     '''
-    I = int(P)
-    w0 = ts.fract(P)
-    w1 = 1.0 - w0
+    if ti.static(boundary == 'clamp'):
+        shape = ti.Vector(field.shape)
+        P = ts.clamp(P, 0, shape - 1)
+        lo = int(P)
+        hi = min(lo + 1, shape - 1)
+        w0 = P - lo
+        w1 = 1.0 - w0
+
+        c00 = field[lo.x, lo.y, lo.z] * w1.x + field[hi.x, lo.y, lo.z] * w0.x
+        c01 = field[lo.x, lo.y, hi.z] * w1.x + field[hi.x, lo.y, hi.z] * w0.x
+        c10 = field[lo.x, hi.y, lo.z] * w1.x + field[hi.x, hi.y, lo.z] * w0.x
+        c11 = field[lo.x, hi.y, hi.z] * w1.x + field[hi.x, hi.y, hi.z] * w0.x
+
+        c0 = c00 * w1.y + c10 * w0.y
+        c1 = c01 * w1.y + c11 * w0.y
+
+        return c0 * w1.z + c1 * w0.z
+    elif ti.static(boundary == 'border'):
+        I = _floor(P, boundary)
+        w0 = P - I
+        w1 = 1.0 - w0
+
+        c00 = _fetch(field, I + D.yyy, boundary, border) * w1.x + _fetch(
+            field, I + D.xyy, boundary, border) * w0.x
+        c01 = _fetch(field, I + D.yyx, boundary, border) * w1.x + _fetch(
+            field, I + D.xyx, boundary, border) * w0.x
+        c10 = _fetch(field, I + D.yxy, boundary, border) * w1.x + _fetch(
+            field, I + D.xxy, boundary, border) * w0.x
+        c11 = _fetch(field, I + D.yxx, boundary, border) * w1.x + _fetch(
+            field, I + D.xxx, boundary, border) * w0.x
+
+        c0 = c00 * w1.y + c10 * w0.y
+        c1 = c01 * w1.y + c11 * w0.y
+
+        return c0 * w1.z + c1 * w0.z
+    else:
+        I = _floor(P, boundary)
+        w0 = P - I
+        shape = ti.Vector(field.shape)
+        lo = boundaryIndex(shape, I, boundary)
+        hi = boundaryIndex(shape, I + 1, boundary)
+        w1 = 1.0 - w0
+
+        c00 = field[lo.x, lo.y, lo.z] * w1.x + field[hi.x, lo.y, lo.z] * w0.x
+        c01 = field[lo.x, lo.y, hi.z] * w1.x + field[hi.x, lo.y, hi.z] * w0.x
+        c10 = field[lo.x, hi.y, lo.z] * w1.x + field[hi.x, hi.y, lo.z] * w0.x
+        c11 = field[lo.x, hi.y, hi.z] * w1.x + field[hi.x, hi.y, hi.z] * w0.x
+
+        c0 = c00 * w1.y + c10 * w0.y
+        c1 = c01 * w1.y + c11 * w0.y
+
+        return c0 * w1.z + c1 * w0.z
+
+
+@ti.func
+def _cubicWeights(t, kind: ti.template()):
+    # Weights of taps at -1, 0, 1, 2 relative to the cell, per axis:
+    if ti.static(kind == 'bspline'):
+        s = 1 - t
+        return ti.Matrix.rows([
+            s * s * s / 6, (4 - 6 * t * t + 3 * t * t * t) / 6,
+            (1 + 3 * t + 3 * t * t - 3 * t * t * t) / 6, t * t * t / 6
+        ])
+    else:
+        return ti.Matrix.rows([
+            t * (-0.5 + t * (1 - 0.5 * t)), 1 + t * t * (-2.5 + 1.5 * t),
+            t * (0.5 + t * (2 - 1.5 * t)), t * t * (-0.5 + 0.5 * t)
+        ])
+
+
+@ti.func
+def _cubicIndices(shape, I, boundary: ti.template()):
+    return ti.Matrix.rows([
+        boundaryIndex(shape, I - 1, boundary),
+        boundaryIndex(shape, I, boundary),
+        boundaryIndex(shape, I + 1, boundary),
+        boundaryIndex(shape, I + 2, boundary)
+    ])
+
+
+@ti.func
+def _cubicInside(shape, I):
+    return ti.Matrix.rows([(0 <= I + k) & (I + k < shape)
+                           for k in ti.static(range(-1, 3))])
+
+
+@ti.func
+def _cubicRow(a, b, c, d, W, axis: ti.template(), kind: ti.template()):
+    ret = W[0, axis] * a + W[1, axis] * b + W[2, axis] * c + W[3, axis] * d
+    if ti.static(kind == 'monotone'):
+        # Never overshoot the two taps enclosing the sample point:
+        ret = ts.clamp(ret, min(b, c), max(b, c))
+    return ret
+
+
+@ti.func
+def _cubicTap(field: ti.template(), X, V, J: ti.template(),
+              boundary: ti.template(), border):
+    ret = field[ti.Vector([X[J[d], d] for d in ti.static(range(len(J)))])]
+    if ti.static(boundary == 'border'):
+        for d in ti.static(range(len(J))):
+            if not V[J[d], d]:
+                ret = ret * 0 + border
+    return ret
+
+
+@ti.func
+def _cubicLine(field: ti.template(), X, V, W, J: ti.template(),
+               kind: ti.template(), boundary: ti.template(), border):
+    # Interpolate along the x-axis, at the tap offsets ``J`` of other axes:
+    a = _cubicTap(field, X, V, ti.static((0, ) + J), boundary, border)
+    b = _cubicTap(field, X, V, ti.static((1, ) + J), boundary, border)
+    c = _cubicTap(field, X, V, ti.static((2, ) + J), boundary, border)
+    d = _cubicTap(field, X, V, ti.static((3, ) + J), boundary, border)
+    return _cubicRow(a, b, c, d, W, 0, kind)
+
+
+@ti.func
+def _cubic2D(field: ti.template(), P, kind: ti.template(),
+             boundary: ti.template(), border):
+    I = _floor(P, boundary)
+    W = _cubicWeights(P - I, kind)
+    shape = ti.Vector(field.shape)
+    X = _cubicIndices(shape, I, boundary)
+    V = X
+    if ti.static(boundary == 'border'):
+        V = _cubicInside(shape, I)
+    return _cubicRow(_cubicLine(field, X, V, W, (0, ), kind, boundary, border),
+                     _cubicLine(field, X, V, W, (1, ), kind, boundary, border),
+                     _cubicLine(field, X, V, W, (2, ), kind, boundary, border),
+                     _cubicLine(field, X, V, W, (3, ), kind, boundary, border),
+                     W, 1, kind)
+
+
+@ti.func
+def _cubicPlane(field: ti.template(), X, V, W, k: ti.template(),
+                kind: ti.template(), boundary: ti.template(), border):
+    return _cubicRow(
+        _cubicLine(field, X, V, W, (0, k), kind, boundary, border),
+        _cubicLine(field, X, V, W, (1, k), kind, boundary, border),
+        _cubicLine(field, X, V, W, (2, k), kind, boundary, border),
+        _cubicLine(field, X, V, W, (3, k), kind, boundary, border), W, 1, kind)
+
+
+@ti.func
+def _cubic3D(field: ti.template(), P, kind: ti.template(),
+             boundary: ti.template(), border):
+    I = _floor(P, boundary)
+    W = _cubicWeights(P - I, kind)
+    shape = ti.Vector(field.shape)
+    X = _cubicIndices(shape, I, boundary)
+    V = X
+    if ti.static(boundary == 'border'):
+        V = _cubicInside(shape, I)
+    return _cubicRow(_cubicPlane(field, X, V, W, 0, kind, boundary, border),
+                     _cubicPlane(field, X, V, W, 1, kind, boundary, border),
+                     _cubicPlane(field, X, V, W, 2, kind, boundary, border),
+                     _cubicPlane(field, X, V, W, 3, kind, boundary, border), W,
+                     2, kind)
+
+
+@ti.func
+def bicubic(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Bicubic B-spline sampling an 2D field with a real index.
+
+    The result is C2-smooth, but it's a smoothing filter: it doesn't pass
+    through the field values, use :func:`catmullRom2D` for interpolation.
+
+    :parameter field: (2D Tensor)
+        Specify the field to sample.
+
+    :parameter P: (2D Vector of float)
+        Specify the index in field.
+
+    :parameter boundary: (string, compile-time)
+        Specify how to handle elements out of the field shape, see
+        :func:`boundaryIndex`. Default to ``'clamp'``.
+
+    :parameter border: (with the same type of field)
+        Specify the value out of the field shape in ``'border'`` mode.
+
+    :note:
+        16 taps are fetched, versus 4 of :func:`bilerp`.
+    '''
+    return _cubic2D(field, P, 'bspline', boundary, border)
+
+
+@ti.func
+def tricubic(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Tricubic B-spline sampling an 3D field with a real index, fetching 64
+    taps, see :func:`bicubic`.
+    '''
+    return _cubic3D(field, P, 'bspline', boundary, border)
+
+
+@ti.func
+def catmullRom2D(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Catmull-Rom cubic interpolating an 2D field with a real index.
+
+    Passes through the field values and is third-order accurate, so it
+    diffuses much less than :func:`bilerp` in advection, but may overshoot
+    near discontinuities, see :func:`monotoneCubic2D`.
+
+    :parameter field: (2D Tensor)
+        Specify the field to sample.
+
+    :parameter P: (2D Vector of float)
+        Specify the index in field.
+
+    :parameter boundary: (string, compile-time)
+        Specify how to handle elements out of the field shape, see
+        :func:`boundaryIndex`. Default to ``'clamp'``.
+
+    :parameter border: (with the same type of field)
+        Specify the value out of the field shape in ``'border'`` mode.
+    '''
+    return _cubic2D(field, P, 'catmullrom', boundary, border)
+
+
+@ti.func
+def catmullRom3D(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Catmull-Rom cubic interpolating an 3D field with a real index, see
+    :func:`catmullRom2D`.
+    '''
+    return _cubic3D(field, P, 'catmullrom', boundary, border)
+
+
+@ti.func
+def monotoneCubic2D(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Monotone cubic interpolating an 2D field with a real index.
+
+    Same as :func:`catmullRom2D`, but each 1D pass is clamped into the
+    range of the two taps enclosing ``P``, so no new extrema are created,
+    suitable for advecting densities and levelsets.
+    '''
+    return _cubic2D(field, P, 'monotone', boundary, border)
+
+
+@ti.func
+def monotoneCubic3D(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Monotone cubic interpolating an 3D field with a real index, see
+    :func:`monotoneCubic2D`.
+    '''
+    return _cubic3D(field, P, 'monotone', boundary, border)
+
+
+@ti.func
+def _packGrad(field: ti.template(), v, gx, gy):
+    if ti.static(hasattr(field, 'n')):
+        return ti.Matrix.rows([v, gx, gy])
+    else:
+        return ti.Vector([v, gx, gy])
+
+
+@ti.func
+def _packGrad3D(field: ti.template(), v, gx, gy, gz):
+    if ti.static(hasattr(field, 'n')):
+        return ti.Matrix.rows([v, gx, gy, gz])
+    else:
+        return ti.Vector([v, gx, gy, gz])
+
+
+@ti.func
+def _cornerTap(field: ti.template(), I, lo, hi, c: ti.template(),
+               boundary: ti.template(), border):
+    ret = field[lo]
+    if ti.static(boundary == 'border'):
+        ret = _fetch(field, I + ti.Vector(c), boundary, border)
+    else:
+        ret = field[lo + (hi - lo) * ti.Vector(c)]
+    return ret
+
+
+@ti.func
+def bilerpGrad(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Bilinear sampling an 2D field with its gradient, from the same 4 taps.
+
+    :parameter field: (2D Tensor)
+        Specify the field to sample.
+
+    :parameter P: (2D Vector of float)
+        Specify the index in field.
+
+    :parameter boundary: (string, compile-time)
+        Specify how to handle elements out of the field shape, see
+        :func:`boundaryIndex`. Default to ``'clamp'``.
+
+    :parameter border: (with the same type of field)
+        Specify the value out of the field shape in ``'border'`` mode.
+
+    :return:
+        For scalar fields, ``vec(value, d/dx, d/dy)``, where ``value`` equals
+        ``bilerp(field, P)`` and derivatives are with respect to ``P``.
+        For vector fields, a matrix whose rows are the value, d/dx and d/dy.
+    '''
+    I = _floor(P, boundary)
+    x = P - I
+    shape = ti.Vector(field.shape)
+    lo = boundaryIndex(shape, I, boundary)
+    hi = boundaryIndex(shape, I + 1, boundary)
+    f00 = _cornerTap(field, I, lo, hi, (0, 0), boundary, border)
+    f10 = _cornerTap(field, I, lo, hi, (1, 0), boundary, border)
+    f01 = _cornerTap(field, I, lo, hi, (0, 1), boundary, border)
+    f11 = _cornerTap(field, I, lo, hi, (1, 1), boundary, border)
+    a = _lerp(f00, f10, x.x)
+    b = _lerp(f01, f11, x.x)
+    return _packGrad(field, _lerp(a, b, x.y), _lerp(f10 - f00, f11 - f01, x.y),
+                     b - a)
+
+
+@ti.func
+def trilerpGrad(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Trilinear sampling an 3D field with its gradient, from the same 8 taps.
+
+    :return:
+        For scalar fields, ``vec(value, d/dx, d/dy, d/dz)``, where ``value``
+        equals ``trilerp(field, P)``. For vector fields, a matrix whose rows
+        are the value, d/dx, d/dy and d/dz, see :func:`bilerpGrad`.
+    '''
+    I = _floor(P, boundary)
+    w = P - I
+    shape = ti.Vector(field.shape)
+    lo = boundaryIndex(shape, I, boundary)
+    hi = boundaryIndex(shape, I + 1, boundary)
+    f000 = _cornerTap(field, I, lo, hi, (0, 0, 0), boundary, border)
+    f100 = _cornerTap(field, I, lo, hi, (1, 0, 0), boundary, border)
+    f010 = _cornerTap(field, I, lo, hi, (0, 1, 0), boundary, border)
+    f110 = _cornerTap(field, I, lo, hi, (1, 1, 0), boundary, border)
+    f001 = _cornerTap(field, I, lo, hi, (0, 0, 1), boundary, border)
+    f101 = _cornerTap(field, I, lo, hi, (1, 0, 1), boundary, border)
+    f011 = _cornerTap(field, I, lo, hi, (0, 1, 1), boundary, border)
+    f111 = _cornerTap(field, I, lo, hi, (1, 1, 1), boundary, border)
+    c00 = _lerp(f000, f100, w.x)
+    c10 = _lerp(f010, f110, w.x)
+    c01 = _lerp(f001, f101, w.x)
+    c11 = _lerp(f011, f111, w.x)
+    c0 = _lerp(c00, c10, w.y)
+    c1 = _lerp(c01, c11, w.y)
+    gx = _lerp(_lerp(f100 - f000, f110 - f010, w.y),
+               _lerp(f101 - f001, f111 - f011, w.y), w.z)
+    gy = _lerp(c10 - c00, c11 - c01, w.z)
+    return _packGrad3D(field, _lerp(c0, c1, w.z), gx, gy, c1 - c0)
+
+
+@ti.func
+def _cubicDerivWeights(t, kind: ti.template()):
+    # Derivatives of ``_cubicWeights`` with respect to ``t``:
+    if ti.static(kind == 'bspline'):
+        s = 1 - t
+        return ti.Matrix.rows([
+            -s * s / 2, t * (-2 + 1.5 * t), 0.5 + t * (1 - 1.5 * t), t * t / 2
+        ])
+    else:
+        return ti.Matrix.rows([
+            -0.5 + t * (2 - 1.5 * t), t * (-5 + 4.5 * t),
+            0.5 + t * (4 - 4.5 * t), t * (-1 + 1.5 * t)
+        ])
+
+
+@ti.func
+def _cubicLineGrad(field: ti.template(), X, V, W, dW, J: ti.template(),
+                   boundary: ti.template(), border):
+    # ``vec(value, d/dx)`` along the x-axis, at the tap offsets ``J``:
+    a = _cubicTap(field, X, V, ti.static((0, ) + J), boundary, border)
+    b = _cubicTap(field, X, V, ti.static((1, ) + J), boundary, border)
+    c = _cubicTap(field, X, V, ti.static((2, ) + J), boundary, border)
+    d = _cubicTap(field, X, V, ti.static((3, ) + J), boundary, border)
+    return ti.Vector([
+        _cubicRow(a, b, c, d, W, 0, 'linear'),
+        _cubicRow(a, b, c, d, dW, 0, 'linear')
+    ])
+
 
-    c00 = ts.sample(field, I + ts.D.yyy) * w1.x + ts.sample(
-        field, I + ts.D.xyy) * w0.x
-    c01 = ts.sample(field, I + ts.D.yyx) * w1.x + ts.sample(
-        field, I + ts.D.xyx) * w0.x
-    c10 = ts.sample(field, I + ts.D.yxy) * w1.x + ts.sample(
-        field, I + ts.D.xxy) * w0.x
-    c11 = ts.sample(field, I + ts.D.yxx) * w1.x + ts.sample(
-        field, I + ts.D.xxx) * w0.x
+@ti.func
+def _cubicPlaneGrad(field: ti.template(), X, V, W, dW, J: ti.template(),
+                    boundary: ti.template(), border):
+    # ``vec(value, d/dx, d/dy)`` in the xy-plane, at the tap offsets ``J``:
+    a = _cubicLineGrad(field, X, V, W, dW, ti.static((0, ) + J), boundary,
+                       border)
+    b = _cubicLineGrad(field, X, V, W, dW, ti.static((1, ) + J), boundary,
+                       border)
+    c = _cubicLineGrad(field, X, V, W, dW, ti.static((2, ) + J), boundary,
+                       border)
+    d = _cubicLineGrad(field, X, V, W, dW, ti.static((3, ) + J), boundary,
+                       border)
+    r = _cubicRow(a, b, c, d, W, 1, 'linear')
+    dr = _cubicRow(a, b, c, d, dW, 1, 'linear')
+    return ti.Vector([r[0], r[1], dr[0]])
 
-    c0 = c00 * w1.y + c10 * w0.y
-    c1 = c01 * w1.y + c11 * w0.y
 
-    return c0 * w1.z + c1 * w0.z
+@ti.func
+def _cubicGrad2D(field: ti.template(), P, kind: ti.template(),
+                 boundary: ti.template(), border):
+    ti.static_assert(not hasattr(field, 'n'),
+                     'Cubic gradients support scalar fields only')
+    I = _floor(P, boundary)
+    W = _cubicWeights(P - I, kind)
+    dW = _cubicDerivWeights(P - I, kind)
+    shape = ti.Vector(field.shape)
+    X = _cubicIndices(shape, I, boundary)
+    V = X
+    if ti.static(boundary == 'border'):
+        V = _cubicInside(shape, I)
+    return _cubicPlaneGrad(field, X, V, W, dW, (), boundary, border)
 
 
 @ti.func
-def superSample2x2(fieldFunc: ti.template(), P, dx=1):
+def _cubicGrad3D(field: ti.template(), P, kind: ti.template(),
+                 boundary: ti.template(), border):
+    ti.static_assert(not hasattr(field, 'n'),
+                     'Cubic gradients support scalar fields only')
+    I = _floor(P, boundary)
+    W = _cubicWeights(P - I, kind)
+    dW = _cubicDerivWeights(P - I, kind)
+    shape = ti.Vector(field.shape)
+    X = _cubicIndices(shape, I, boundary)
+    V = X
+    if ti.static(boundary == 'border'):
+        V = _cubicInside(shape, I)
+    a = _cubicPlaneGrad(field, X, V, W, dW, (0, ), boundary, border)
+    b = _cubicPlaneGrad(field, X, V, W, dW, (1, ), boundary, border)
+    c = _cubicPlaneGrad(field, X, V, W, dW, (2, ), boundary, border)
+    d = _cubicPlaneGrad(field, X, V, W, dW, (3, ), boundary, border)
+    r = _cubicRow(a, b, c, d, W, 2, 'linear')
+    dr = _cubicRow(a, b, c, d, dW, 2, 'linear')
+    return ti.Vector([r[0], r[1], r[2], dr[0]])
+
+
+@ti.func
+def bicubicGrad(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    B-spline sampling an 2D scalar field with its gradient, from the same
+    16 taps, see :func:`bicubic` and :func:`bilerpGrad`.
+
+    :return:
+        ``vec(value, d/dx, d/dy)``.
+    '''
+    return _cubicGrad2D(field, P, 'bspline', boundary, border)
+
+
+@ti.func
+def tricubicGrad(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    B-spline sampling an 3D scalar field with its gradient, from the same
+    64 taps, see :func:`tricubic` and :func:`trilerpGrad`.
+
+    :return:
+        ``vec(value, d/dx, d/dy, d/dz)``.
+    '''
+    return _cubicGrad3D(field, P, 'bspline', boundary, border)
+
+
+@ti.func
+def catmullRom2DGrad(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Catmull-Rom interpolating an 2D scalar field with its gradient, from
+    the same 16 taps, see :func:`catmullRom2D` and :func:`bilerpGrad`.
+
+    :return:
+        ``vec(value, d/dx, d/dy)``.
+    '''
+    return _cubicGrad2D(field, P, 'catmullrom', boundary, border)
+
+
+@ti.func
+def catmullRom3DGrad(
+        field: ti.template(), P, boundary: ti.template() = 'clamp', border=0):
+    '''
+    Catmull-Rom interpolating an 3D scalar field with its gradient, from
+    the same 64 taps, see :func:`catmullRom3D` and :func:`trilerpGrad`.
+
+    :return:
+        ``vec(value, d/dx, d/dy, d/dz)``.
+    '''
+    return _cubicGrad3D(field, P, 'catmullrom', boundary, border)
+
+
+@ti.func
+def _superTap(fieldFunc: ti.template(), field: ti.template(), P,
+              boundary: ti.template(), border):
+    if ti.static(field is None):
+        return fieldFunc(P)
+    else:
+        return bilerp(field, P, boundary, border)
+
+
+@ti.func
+def superSample2x2(fieldFunc: ti.template(),
+                   P,
+                   dx=1,
+                   field: ti.template() = None,
+                   boundary: ti.template() = 'clamp',
+                   border=0):
+    '''
+    Average 4 taps around ``P`` in a 2x2 box pattern of size ``dx``.
+
+    :parameter fieldFunc: (ti.func)
+        Specify the function to sample, called as ``fieldFunc(P)``.
+        Pass ``None`` to sample ``field`` instead.
+
+    :parameter field: (2D Tensor, optional)
+        Specify a field to bilinear sample instead of ``fieldFunc``, with
+        the ``boundary`` mode and ``border`` value, see :func:`bilerp`.
+    '''
     dD = dx / 2 * D
-    return (fieldFunc(P + dD.yy) + fieldFunc(P + dD.yz) +
-            fieldFunc(P + dD.zz) + fieldFunc(P + dD.zy)) * 0.25
+    return (_superTap(fieldFunc, field, P + dD.yy, boundary, border) +
+            _superTap(fieldFunc, field, P + dD.yz, boundary, border) +
+            _superTap(fieldFunc, field, P + dD.zz, boundary, border) +
+            _superTap(fieldFunc, field, P + dD.zy, boundary, border)) * 0.25
+
+
+@functools.lru_cache(maxsize=None)
+def _superOffsets(pattern, n):
+    '''
+    Offsets of ``n * n`` taps in the pixel footprint ``[-0.5, 0.5]**2``.
+    '''
+    grid = [((i + 0.5) / n - 0.5, (j + 0.5) / n - 0.5) for i in range(n)
+            for j in range(n)]
+    if pattern in ['grid', 'jitter']:
+        return tuple(grid)
+    elif pattern == 'rgss':
+        # Rotate by atan(1/2) so that no two taps share a row or column:
+        c, s = 2 / math.sqrt(5), 1 / math.sqrt(5)
+        return tuple(
+            ((c * x - s * y + 0.5) % 1 - 0.5, (s * x + c * y + 0.5) % 1 - 0.5)
+            for x, y in grid)
+    elif pattern == 'poisson':
+        # Mitchell's best-candidate, deterministic for a given ``n``:
+        rng = np.random.RandomState(n)
+        points = [rng.uniform(-0.5, 0.5, 2)]
+        while len(points) < n * n:
+            cands = rng.uniform(-0.5, 0.5, (16 * len(points), 2))
+            dist = np.min(np.linalg.norm(cands[:, None] - np.array(points),
+                                         axis=2),
+                          axis=1)
+            points.append(cands[np.argmax(dist)])
+        return tuple((float(x), float(y)) for x, y in points)
+    raise ValueError(f'Unknown supersampling pattern: {pattern}')
+
+
+@ti.func
+def _superOffset(o: ti.template(), n: ti.template(), pattern: ti.template(),
+                 filter: ti.template()):
+    off = ti.Vector(o)
+    if ti.static(pattern == 'jitter'):
+        off += (ts.vec(ts.rand(), ts.rand()) - 0.5) / n
+    if ti.static(filter != 'box'):
+        # Tent and Gaussian filters span two pixels:
+        off *= 2
+    return off
+
+
+@ti.func
+def _filterWeight(off, filter: ti.template()):
+    ret = 1.0
+    if ti.static(filter == 'tent'):
+        ret = (1 - abs(off.x)) * (1 - abs(off.y))
+    elif ti.static(filter == 'gaussian'):
+        ret = ti.exp(-2 * off.dot(off))
+    else:
+        ti.static_assert(ti.static(filter == 'box'), 'Unknown filter')
+    return ret
+
+
+@ti.func
+def superSample(fieldFunc: ti.template(),
+                P,
+                dx=1,
+                n: ti.template() = 2,
+                pattern: ti.template() = 'grid',
+                filter: ti.template() = 'box',
+                field: ti.template() = None,
+                boundary: ti.template() = 'clamp',
+                border=0):
+    '''
+    Supersample a 2D function or field around ``P`` with ``n * n`` taps.
+
+    :parameter fieldFunc: (ti.func)
+        Specify the function to sample, or ``None`` to sample ``field``,
+        see :func:`superSample2x2`.
+
+    :parameter P: (2D Vector of float)
+        Specify the center of pixel to sample.
+
+    :parameter dx: (float)
+        Specify the pixel size.
+
+    :parameter n: (int, compile-time)
+        Specify the number of taps per axis.
+
+    :parameter pattern: (string, compile-time)
+        Specify the tap pattern:
+
+        * ``'grid'``: regular ``n x n`` grid.
+        * ``'rgss'``: rotated grid, better on near-horizontal and
+          near-vertical edges at the same cost.
+        * ``'jitter'``: stratified, one random tap per grid cell, trading
+          aliasing for noise.
+        * ``'poisson'``: precomputed Poisson-disk set.
+
+    :parameter filter: (string, compile-time)
+        Specify the reconstruction filter: ``'box'`` over the pixel, or
+        ``'tent'`` / ``'gaussian'`` spanning two pixels.
+
+    :return:
+        The filter-weighted average of taps.
+
+    :note:
+        Tap offsets and weights are compile-time constants, except with
+        ``'jitter'``. ``superSample2x2(f, P, dx)`` is the 2x2 ``'grid'``
+        box pattern anchored at a pixel corner.
+    '''
+    offsets = ti.static(_superOffsets(pattern, n))
+    off0 = _superOffset(offsets[0], n, pattern, filter)
+    w0 = _filterWeight(off0, filter)
+    ret = w0 * _superTap(fieldFunc, field, P + off0 * dx, boundary, border)
+    wsum = w0
+    for o in ti.static(offsets[1:]):
+        off = _superOffset(o, n, pattern, filter)
+        w = _filterWeight(off, filter)
+        ret += w * _superTap(fieldFunc, field, P + off * dx, boundary, border)
+        wsum += w
+    return ret / wsum
+
+
+@ti.func
+def superSampleAdaptive(fieldFunc: ti.template(),
+                        coarse: ti.template(),
+                        I,
+                        P,
+                        dx=1,
+                        threshold=0.05,
+                        n: ti.template() = 4,
+                        pattern: ti.template() = 'rgss',
+                        filter: ti.template() = 'box'):
+    '''
+    Supersample only the pixels differing from their neighbours.
+
+    Takes an image already rendered with one tap per pixel, and returns
+    it unchanged in smooth regions, or :func:`superSample` where any of
+    the 4 neighbouring pixels differ by more than ``threshold``.
+
+    :parameter fieldFunc: (ti.func)
+        Specify the function to sample, see :func:`superSample`.
+
+    :parameter coarse: (2D Tensor)
+        Specify the image rendered with one tap per pixel.
+
+    :parameter I: (2D Vector of int)
+        Specify the pixel index in ``coarse``.
+
+    :parameter P: (2D Vector of float)
+        Specify the center of pixel ``I``, passed to ``fieldFunc``.
+
+    :parameter threshold: (float)
+        Specify the max difference (of any component) to leave alone.
+
+    For example::
+
+        @ti.kernel
+        def render():
+            for I in ti.grouped(img):
+                tmp[I] = shade((I + 0.5) * dx)
+            for I in ti.grouped(img):
+                img[I] = ts.superSampleAdaptive(shade, tmp, I,
+                                                (I + 0.5) * dx, dx)
+    '''
+    c = coarse[I]
+    diff = abs(sample(coarse, I + D.xy) - c)
+    diff = max(diff, abs(sample(coarse, I + D.zy) - c))
+    diff = max(diff, abs(sample(coarse, I + D.yx) - c))
+    diff = max(diff, abs(sample(coarse, I + D.yz) - c))
+    if ti.static(hasattr(coarse, 'n')):
+        diff = ts.maximum(diff)
+    ret = c
+    if diff > threshold:
+        ret = superSample(fieldFunc, P, dx, n, pattern, filter)
+    return ret
+
+
+def _sparseBlock(field):
+    '''
+    Find the nearest pointer / bitmasked ancestor of a field, returns its
+    depth, i.e. ``field.snode.parent(depth)``, and the size of its blocks in
+    elements, or ``(None, None)`` for dense fields.
+
+    SNodes can't be ``ti.static`` values, so kernels keep the depth only.
+    '''
+    depth = 1
+    snode = field.snode.parent()
+    while snode is not None and snode.ptr is not None:
+        if snode.ptr.type.name in ['pointer', 'bitmasked']:
+            size = tuple(n // m for n, m in zip(field.shape, snode.shape))
+            return depth, size
+        snode = snode.parent()
+        depth += 1
+    return None, None
+
+
+@ti.func
+def _background(field: ti.template(), background):
+    if ti.static(hasattr(field, 'n')):
+        return ti.Vector.zero(field.dtype, field.n) + background
+    else:
+        return ti.cast(background, field.dtype)
+
+
+@ti.func
+def _sparseTap(field: ti.template(), block: ti.template(), J, background):
+    B = ti.static(_sparseBlock(field)[1])
+    ret = _background(field, background)
+    # ``ti.is_active`` takes the index of the block, not of the element:
+    if ti.is_active(block, J // ti.Vector(B)):
+        ret = field[J]
+    return ret
+
+
+@ti.func
+def sparseSample(field: ti.template(), P, background=0):
+    '''
+    Sampling a block-sparse field, without descending into inactive blocks.
+
+    :parameter field: (Tensor)
+        Specify the field to sample, placed under a ``pointer`` or
+        ``bitmasked`` SNode, e.g.
+        ``ti.root.pointer(ti.ij, 64).dense(ti.ij, 8).place(field)``.
+        Dense fields are sampled by :func:`sample`.
+
+    :parameter P: (Vector)
+        Specify the index in field, clamped into the field shape.
+
+    :parameter background: (scalar or with the same type of field)
+        Specify the value of elements in inactive blocks.
+    '''
+    depth = ti.static(_sparseBlock(field)[0])
+    ret = _background(field, background)
+    if ti.static(depth is None):
+        ret = sample(field, P)
+    else:
+        shape = ti.Vector(field.shape)
+        ret = _sparseTap(field, field.snode.parent(depth),
+                         int(ts.clamp(P, 0, shape - 1)), background)
+    return ret
+
+
+@ti.func
+def _sparseCorner(field: ti.template(), block: ti.template(), lo, hi,
+                  c: ti.template(), background, check: ti.template()):
+    # ``c`` selects ``lo`` or ``hi`` of the first axes, others are ``lo``:
+    J = lo + (hi - lo) * ti.Vector(ti.static(c + (0, ) * (lo.n - len(c))))
+    if ti.static(check):
+        return _sparseTap(field, block, J, background)
+    else:
+        return field[J]
+
+
+@ti.func
+def _sparseBilerpCorners(field: ti.template(), block: ti.template(), lo, hi, x,
+                         background, check: ti.template()):
+    f00 = _sparseCorner(field, block, lo, hi, (0, 0), background, check)
+    f10 = _sparseCorner(field, block, lo, hi, (1, 0), background, check)
+    f01 = _sparseCorner(field, block, lo, hi, (0, 1), background, check)
+    f11 = _sparseCorner(field, block, lo, hi, (1, 1), background, check)
+    return _lerp(_lerp(f00, f10, x.x), _lerp(f01, f11, x.x), x.y)
+
+
+@ti.func
+def _sparseTrilerpCorners(field: ti.template(), block: ti.template(), lo, hi,
+                          w, background, check: ti.template()):
+    c0 = _sparseBilerpCorners(field, block, lo, hi - (hi - lo) * D.yyx, w,
+                              background, check)
+    c1 = _sparseBilerpCorners(field, block, lo + (hi - lo) * D.yyx, hi, w,
+                              background, check)
+    return _lerp(c0, c1, w.z)
+
+
+@ti.func
+def sparseBilerp(field: ti.template(), P, background=0):
+    '''
+    Bilinear sampling a block-sparse 2D field, see :func:`sparseSample`.
+
+    When all the 4 taps lie in the same block (the common case), the
+    block is checked active only once, and skipped entirely if not;
+    otherwise each tap checks its own block.
+    '''
+    depth, B = ti.static(*_sparseBlock(field))
+    ret = _background(field, background)
+    if ti.static(depth is None):
+        ret = bilerp(field, P)
+    else:
+        I = int(ti.floor(P))
+        shape = ti.Vector(field.shape)
+        lo = ts.clamp(I, 0, shape - 1)
+        hi = ts.clamp(I + 1, 0, shape - 1)
+        if (lo // ti.Vector(B) == hi // ti.Vector(B)).all():
+            if ti.is_active(field.snode.parent(depth), lo // ti.Vector(B)):
+                ret = _sparseBilerpCorners(field, field.snode.parent(depth),
+                                           lo, hi, P - I, background, False)
+        else:
+            ret = _sparseBilerpCorners(field, field.snode.parent(depth), lo,
+                                       hi, P - I, background, True)
+    return ret
+
+
+@ti.func
+def sparseTrilerp(field: ti.template(), P, background=0):
+    '''
+    Trilinear sampling a block-sparse 3D field, see :func:`sparseBilerp`.
+    '''
+    depth, B = ti.static(*_sparseBlock(field))
+    ret = _background(field, background)
+    if ti.static(depth is None):
+        ret = trilerp(field, P)
+    else:
+        I = int(ti.floor(P))
+        shape = ti.Vector(field.shape)
+        lo = ts.clamp(I, 0, shape - 1)
+        hi = ts.clamp(I + 1, 0, shape - 1)
+        if (lo // ti.Vector(B) == hi // ti.Vector(B)).all():
+            if ti.is_active(field.snode.parent(depth), lo // ti.Vector(B)):
+                ret = _sparseTrilerpCorners(field, field.snode.parent(depth),
+                                            lo, hi, P - I, background, False)
+        else:
+            ret = _sparseTrilerpCorners(field, field.snode.parent(depth), lo,
+                                        hi, P - I, background, True)
+    return ret
+
+
+@ti.func
+def _sampleBy(field: ti.template(), P, mode: ti.template(),
+              boundary: ti.template(), dfl):
+    ret = field[int(P * 0)]
+    if ti.static(mode == 'sample'):
+        ret = sample(field, P, boundary, dfl)
+    elif ti.static(mode == 'bilerp'):
+        ret = bilerp(field, P, boundary, dfl)
+    elif ti.static(mode == 'trilerp'):
+        ret = trilerp(field, P, boundary, dfl)
+    return ret
+
+
+@ti.kernel
+def _sampleArray(field: ti.template(), pos: ti.ext_arr(), out: ti.ext_arr(),
+                 dfl: ti.ext_arr(), mode: ti.template(),
+                 boundary: ti.template(), nc: ti.template()):
+    dim = ti.static(len(field.shape))
+    d = field[ti.Vector.zero(ti.i32, dim)]
+    if ti.static(nc == 0):
+        d = dfl[0]
+    else:
+        for c in ti.static(range(nc)):
+            d[c] = dfl[c]
+    for i in range(pos.shape[0]):
+        P = ti.Vector.zero(ti.f32, dim)
+        for k in ti.static(range(dim)):
+            P[k] = pos[i, k]
+        val = _sampleBy(field, P, mode, boundary, d)
+        if ti.static(nc == 0):
+            out[i] = val
+        else:
+            for c in ti.static(range(nc)):
+                out[i, c] = val[c]
+
+
+@ti.kernel
+def _sampleField(field: ti.template(), pos: ti.template(), out: ti.template(),
+                 dfl: ti.ext_arr(), mode: ti.template(),
+                 boundary: ti.template(), nc: ti.template()):
+    d = field[ti.Vector.zero(ti.i32, ti.static(len(field.shape)))]
+    if ti.static(nc == 0):
+        d = dfl[0]
+    else:
+        for c in ti.static(range(nc)):
+            d[c] = dfl[c]
+    for I in ti.grouped(pos):
+        out[I] = _sampleBy(field, pos[I], mode, boundary, d)
+
+
+def _sampleMany(field, pos, mode, boundary, dfl=0, out=None):
+    nc = getattr(field, 'n', 0)
+    if getattr(field, 'm', 1) != 1:
+        raise TypeError('Sampling matrix fields is not supported')
+    dtype = ti.to_numpy_type(field.dtype)
+    dfl = np.broadcast_to(np.asarray(dfl, dtype=dtype), max(nc, 1)).copy()
+    if out is not None and not isinstance(out, np.ndarray):
+        _sampleField(field, pos, out, dfl, mode, boundary, nc)
+        return out
+
+    shape = None
+    if not isinstance(pos, (np.ndarray, list, tuple)):
+        # Fields can't be allocated once kernels ran, read ``pos`` back
+        # and return a fresh array instead:
+        shape = pos.shape
+        pos = pos.to_numpy()
+    pos = np.ascontiguousarray(pos, dtype=np.float32)
+    pos = pos.reshape(-1, len(field.shape))
+    if out is None:
+        out = np.empty((pos.shape[0], nc) if nc else pos.shape[0], dtype=dtype)
+    _sampleArray(field, pos, out, dfl, mode, boundary, nc)
+    if shape is not None:
+        out = out.reshape(*shape, *out.shape[1:])
+    return out
+
+
+def sampleAt(field, pos, out=None, boundary='clamp', border=0):
+    '''
+    Sample a field at many points from Python-scope, in one kernel launch,
+    see :func:`sample`.
+
+    :parameter field: (Tensor)
+        Specify the field to sample, scalar or vector.
+
+    :parameter pos: (numpy array or Vector Tensor)
+        Specify the indices to sample at.
+        A numpy array of shape ``(n, dim)``, or a vector field of ``dim``
+        components, where ``dim`` is the dimension of ``field``.
+
+    :parameter out: (numpy array or Tensor, optional)
+        Specify where to store the result, a new numpy array if not
+        specified. For field ``pos``, pass a field of the same shape to
+        keep the result on device.
+
+    :parameter boundary: (string)
+        Specify the boundary mode, see :func:`boundaryIndex`.
+
+    :parameter border: (scalar or tuple)
+        Specify the value out of the field shape in ``'border'`` mode.
+
+    :return:
+        ``out`` if specified, otherwise a numpy array of shape ``(n,)`` for
+        scalar fields or ``(n, components)`` for vector fields, where
+        ``n`` is the number of positions. For field ``pos``, the array has
+        the shape of ``pos`` instead of ``(n,)``.
+
+    :note:
+        Kernels are compiled once per field and sampling mode, and reused
+        for any number of points.
+    '''
+    return _sampleMany(field, pos, 'sample', boundary, border, out)
+
+
+def dflSampleAt(field, pos, dfl, out=None):
+    '''
+    Sample a field at many points from Python-scope, with default value
+    ``dfl`` out of the field shape, see :func:`dflSample` and
+    :func:`sampleAt`.
+    '''
+    return _sampleMany(field, pos, 'sample', 'border', dfl, out)
+
+
+def bilerpAt(field, pos, out=None, boundary='clamp', border=0):
+    '''
+    Bilinear sample a 2D field at many points from Python-scope, see
+    :func:`bilerp` and :func:`sampleAt`.
+    '''
+    return _sampleMany(field, pos, 'bilerp', boundary, border, out)
+
+
+def trilerpAt(field, pos, out=None, boundary='clamp', border=0):
+    '''
+    Trilinear sample a 3D field at many points from Python-scope, see
+    :func:`trilerp` and :func:`sampleAt`.
+    '''
+    return _sampleMany(field, pos, 'trilerp', boundary, border, out)
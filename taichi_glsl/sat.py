@@ -0,0 +1,151 @@
+'''
+Summed-area tables of fields, for constant-cost box filtering.
+'''
+
+import taichi as ti
+import taichi_glsl as ts
+import math
+
+
+@ti.data_oriented
+class SummedAreaTable:
+    '''
+    A summed-area table (integral image) of a field of any dimension.
+
+    ``table[I]`` holds the sum of ``src`` over the box ``[0, I)``, so that
+    the sum over any box is fetched in ``2**dim`` taps, see :func:`boxSum`
+    and :func:`boxSample`.
+
+    :parameter src: (Tensor)
+        Specify the field to sum, scalar or vector.
+
+    :parameter dtype: (DataType, optional)
+        Specify the type of sums, default to that of ``src``. Large float32
+        tables lose precision in small boxes far from the origin, specify
+        ``ti.f64`` if the backend supports it.
+
+    For example, a blur of variable radius ``r[I]``::
+
+        sat = ts.SummedAreaTable(img)
+        sat.build()
+
+        @ti.kernel
+        def blur():
+            for I in ti.grouped(out):
+                out[I] = ts.boxSample(sat, I - r[I], I + r[I] + 1)
+
+    Local mean and variance follow from tables of ``x`` and ``x**2``.
+    '''
+    def __init__(self, src, dtype=None):
+        self.src = src
+        self.dim = len(src.shape)
+        self.shape = tuple(src.shape)
+        dtype = dtype or src.dtype
+        shape = tuple(n + 1 for n in self.shape)
+        if hasattr(src, 'n'):
+            self.table = ti.Vector.field(src.n, dtype, shape)
+        else:
+            self.table = ti.field(dtype, shape)
+        # Lines scanned along each axis, split into blocks of about
+        # sqrt(length) elements, and corners of box queries:
+        self.block = [math.ceil(math.sqrt(n)) for n in self.shape]
+        self.lines = []
+        self.blocks = []
+        for axis in range(self.dim):
+            nb = math.ceil(self.shape[axis] / self.block[axis])
+            self.lines.append(
+                tuple(1 if d == axis else n + 1
+                      for d, n in enumerate(self.shape)))
+            self.blocks.append(
+                tuple(nb if d == axis else n + 1
+                      for d, n in enumerate(self.shape)))
+        self.corners = []
+        for m in range(2**self.dim):
+            c = tuple((m >> d) & 1 for d in range(self.dim))
+            self.corners.append((c, -1 if sum(c) % 2 else 1))
+
+    @ti.kernel
+    def _copy(self):
+        for I in ti.grouped(self.src):
+            self.table[I + 1] = self.src[I]
+
+    @ti.kernel
+    def _scan(self, axis: ti.template()):
+        e = ti.Vector.unit(self.dim, axis, ti.i32)
+        B = ti.static(self.block[axis])
+        L = ti.static(self.shape[axis])
+        # Element ``k`` of a line lies in block ``(k - 1) // B``, the last
+        # element of block ``b`` is ``min((b + 1) * B, L)``.
+        # 1. Scan each block of each line, all blocks in parallel:
+        for I in ti.grouped(ti.ndrange(*self.blocks[axis])):
+            b = I[axis]
+            O = I - b * e
+            for k in range(b * B + 2, min((b + 1) * B, L) + 1):
+                self.table[O + k * e] += self.table[O + (k - 1) * e]
+        # 2. Scan the block totals of each line, all lines in parallel:
+        for O in ti.grouped(ti.ndrange(*self.lines[axis])):
+            for b in range(1, self.blocks[axis][axis]):
+                k = min((b + 1) * B, L)
+                self.table[O + k * e] += self.table[O + b * B * e]
+        # 3. Add the total of previous blocks to the other elements:
+        for I in ti.grouped(self.table):
+            k = I[axis]
+            b = (k - 1) // B
+            if k > B and k != min((b + 1) * B, L):
+                self.table[I] += self.table[I + (b * B - k) * e]
+
+    def build(self):
+        '''
+        Rebuild the table from ``src``, by a prefix scan along each axis.
+
+        Each line is split into blocks of about ``sqrt(length)`` elements,
+        scanned in parallel, then the block totals are propagated, so that
+        even a 1D field or an axis with few lines is scanned in parallel.
+        '''
+        self._copy()
+        for axis in range(self.dim):
+            self._scan(axis)
+
+
+@ti.func
+def boxSum(sat: ti.template(), lo, hi):
+    '''
+    Sum a field over a box in ``2**dim`` taps, whatever the box size is.
+
+    :parameter sat: (SummedAreaTable)
+        Specify the table of field to sum.
+
+    :parameter lo: (Vector of int)
+        Specify the lower corner (inclusive) of the box.
+
+    :parameter hi: (Vector of int)
+        Specify the upper corner (exclusive) of the box.
+
+    :return:
+        The sum over the box clamped into the field shape.
+    '''
+    shape = ti.Vector(sat.shape)
+    lo = ts.clamp(int(lo), 0, shape)
+    hi = ts.clamp(int(hi), lo, shape)
+    ret = sat.table[hi] * 0
+    for c, sign in ti.static(sat.corners):
+        # Inclusion-exclusion over corners, ``c[d] == 1`` picks ``lo``:
+        ret += sign * sat.table[hi + (lo - hi) * ti.Vector(c)]
+    return ret
+
+
+@ti.func
+def boxSample(sat: ti.template(), lo, hi):
+    '''
+    Average a field over a box in ``2**dim`` taps, see :func:`boxSum`.
+
+    :return:
+        The mean over the box clamped into the field shape, or zero if the
+        box is empty.
+    '''
+    shape = ti.Vector(sat.shape)
+    size = ts.clamp(int(hi), 0, shape) - ts.clamp(int(lo), 0, shape)
+    vol = 1
+    for d in ti.static(range(sat.dim)):
+        vol *= max(size[d], 0)
+    return boxSum(sat, lo, hi) / max(vol, 1)
@@ -0,0 +1,67 @@
+from taichi_glsl import *
+
+
+@ti.host_arch_only
+def test_mac_grid():
+    vel = MacGrid.field((4, 3))
+    div = array(float, 4, 3)
+    mid = vec_array(2, float)
+    assert vel.res == (4, 3)
+    assert vel.u.shape == (5, 3)
+    assert vel.v.shape == (4, 4)
+
+    @ti.kernel
+    def func():
+        # u = 2x, v = -y, sampled on faces:
+        for I in ti.grouped(vel.u):
+            vel.u[I] = 2 * (I.x - 0.5)
+        for I in ti.grouped(vel.v):
+            vel.v[I] = -(I.y - 0.5)
+        for I in ti.grouped(div):
+            div[I] = vel.divergence(I)
+        mid[None] = vel.macSample(vec(1.25, 1.5))
+
+    func()
+    assert np.allclose(div.to_numpy(), 1)
+    assert np.allclose(mid.to_numpy(), [2.5, -1.5])
+
+
+@ti.host_arch_only
+def test_mac_grid_project():
+    n = 4
+    vel = MacGrid.field((n, n))
+    p = array(float, n, n)
+    div = array(float, n, n)
+    rng = np.random.RandomState(0)
+    u = rng.rand(n + 1, n).astype(np.float32)
+    v = rng.rand(n, n + 1).astype(np.float32)
+    vel.u.from_numpy(u)
+    vel.v.from_numpy(v)
+
+    # Solve for the pressure on the host, with closed boundaries:
+    u[0, :] = u[n, :] = 0
+    v[:, 0] = v[:, n] = 0
+    rhs = (u[1:] - u[:-1] + v[:, 1:] - v[:, :-1]).ravel()
+    A = np.zeros((n * n, n * n))
+    for i in range(n):
+        for j in range(n):
+            for a, b in [(i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)]:
+                if 0 <= a < n and 0 <= b < n:
+                    A[i * n + j, a * n + b] += 1
+                    A[i * n + j, i * n + j] -= 1
+    p.from_numpy(np.linalg.lstsq(A, rhs, rcond=None)[0].reshape(n, n))
+
+    @ti.kernel
+    def project():
+        vel.project(p)
+
+    @ti.kernel
+    def compute_div():
+        for I in ti.grouped(div):
+            div[I] = vel.divergence(I)
+
+    project()
+    compute_div()
+    assert np.allclose(div.to_numpy(), 0, atol=1e-5)
+    assert np.allclose(vel.u.to_numpy()[[0, n]], 0)
+    assert np.allclose(vel.v.to_numpy()[:, [0, n]], 0)
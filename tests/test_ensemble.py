@@ -0,0 +1,75 @@
+from taichi_glsl import *
+import pytest
+
+
+@ti.host_arch_only
+def test_ensemble_field():
+    ens = Ensemble(3)
+    assert ens.field(float, (4, 2)).shape == (3, 4, 2)
+    assert ens.field(float, 5).shape == (3, 5)
+    assert ens.vec_field(2, float, (4, 2)).shape == (3, 4, 2)
+
+
+@ti.host_arch_only
+def test_ensemble_param():
+    ens = Ensemble(3, kappa=[0.5, 1, 2])
+    ens.param('wind', np.array([[0, 1], [1, 0], [2, 2]]))
+    x = vec_array(3, float, 3)
+
+    @ti.kernel
+    def func():
+        for b in range(ens.n):
+            x[b] = vec(ens.kappa[b], ens.wind[b].x, ens.wind[b].y)
+
+    func()
+    assert np.allclose(x.to_numpy(), [[0.5, 0, 1], [1, 1, 0], [2, 2, 2]])
+    with pytest.raises(ValueError):
+        ens.param('bad', [1, 2])
+
+
+@ti.host_arch_only
+def test_ensemble_mosaic():
+    ens = Ensemble(3)
+    src = ens.field(float, (2, 2))
+    for b in range(3):
+        for i in range(2):
+            for j in range(2):
+                src[b, i, j] = b + 1
+    dst = ens.mosaic_field(src)
+    assert ens.mosaic_res(src.shape) == (4, 4)
+    assert dst.shape == (4, 4)
+    dst.fill(-1)
+    ens.mosaic(src, dst)
+    # Instance 0 at top-left, y pointing up, the unused tile is untouched:
+    assert np.allclose(
+        dst.to_numpy(),
+        [[3, 3, 1, 1], [3, 3, 1, 1], [-1, -1, 2, 2], [-1, -1, 2, 2]])
+
+
+class Sweep(Animation):
+    def on_init(self):
+        self.ensemble = Ensemble(5, gain=np.arange(5))
+        self.img = self.ensemble.field(float, (8, 4))
+
+    @ti.kernel
+    def on_render(self):
+        for b, i, j in self.img:
+            self.img[b, i, j] = self.ensemble.gain[b]
+
+    def on_show(self):
+        self.gui_res = self.gui.res
+
+
+@ti.host_arch_only
+def test_ensemble_animation():
+    sink = RingBufferSink(1)
+    animation = Sweep()
+    animation.gui_backend = 'headless'
+    animation.frame_sink = sink
+    animation.max_frames = 2
+    res = animation.ensemble.mosaic_res(animation.img.shape)
+    assert res == (24, 8)
+    assert animation.resolution == res
+    animation.start()
+    assert animation.gui_res == res
+    assert sink.latest.shape[:2] == res
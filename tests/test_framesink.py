@@ -0,0 +1,90 @@
+from taichi_glsl import *
+import pytest
+import shutil
+import sys
+import os
+
+
+def test_ring_buffer_sink():
+    sink = RingBufferSink(3)
+    assert sink.frames is None and sink.latest is None
+    for i in range(5):
+        sink.write(i, np.full((2, 2), i, dtype=np.float32))
+    assert list(sink.frames[:, 0, 0]) == [2, 3, 4]
+    assert sorted(sink.frame_ids) == [2, 3, 4]
+    assert np.all(sink.latest == 4)
+
+
+def test_pipelined_sink_order():
+    frames = []
+    with PipelinedSink(CallbackSink(lambda i, img: frames.append(i)),
+                       depth=2) as sink:
+        for i in range(20):
+            sink.write(i, np.zeros(1))
+        sink.flush()
+        assert frames == list(range(20))
+
+
+def test_pipelined_sink_error():
+    def callback(i, img):
+        if i == 3:
+            raise ValueError('bad frame')
+
+    sink = PipelinedSink(CallbackSink(callback))
+    for i in range(5):
+        sink.write(i, np.zeros(1))
+    with pytest.raises(ValueError):
+        sink.flush()
+    sink.close()
+
+
+def test_video_sink_verbose_encoder(tmp_path):
+    # A fake encoder writing much more to stderr than a pipe buffer holds:
+    encoder = tmp_path / 'encoder'
+    encoder.write_text(f'#!{sys.executable}\n'
+                       'import sys\n'
+                       'sys.stderr.write("x" * 2**20)\n'
+                       'sys.stdin.buffer.read()\n'
+                       'sys.exit(1)\n')
+    encoder.chmod(0o755)
+    sink = VideoSink(str(tmp_path / 'video'), ffmpeg=str(encoder))
+    for i in range(3):
+        sink.write(i, np.zeros((256, 256, 3), dtype=np.float32))
+    with pytest.raises(RuntimeError, match='xxx'):
+        sink.close()
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_video_sink_gif(tmp_path):
+    sink = VideoSink(str(tmp_path / 'video'), ['mp4', 'gif'])
+    for i in range(8):
+        sink.write(i, np.full((32, 32, 3), i / 8, dtype=np.float32))
+    tmpdir = sink.tmpdir
+    sink.close()
+    assert (tmp_path / 'video.mp4').stat().st_size > 0
+    assert (tmp_path / 'video.gif').read_bytes()[:3] == b'GIF'
+    assert not os.path.exists(tmpdir)
+
+
+def test_pooled_sink():
+    frames = []
+    with PooledSink(CallbackSink(lambda i, img: frames.append(i)),
+                    workers=4,
+                    depth=4) as sink:
+        for i in range(20):
+            sink.write(i, np.zeros(1))
+        sink.flush()
+    assert sorted(frames) == list(range(20))
+
+
+def test_pooled_sink_error():
+    def callback(i, img):
+        if i == 3:
+            raise ValueError('bad frame')
+
+    sink = PooledSink(CallbackSink(callback), workers=2)
+    for i in range(5):
+        sink.write(i, np.zeros(1))
+    with pytest.raises(ValueError):
+        sink.flush()
+    sink.close()
@@ -0,0 +1,314 @@
+from taichi_glsl import *
+from pytest import approx
+import pytest
+
+
+def test_scripted_input():
+    script = ScriptedInput({
+        0: {
+            'pos': (0.25, 0.5),
+            'events': [(ti.GUI.PRESS, 'w')]
+        },
+        2: {
+            'events': [(ti.GUI.RELEASE, 'w')]
+        },
+    })
+    gui = HeadlessGUI(res=(4, 4), script=script, max_frames=3)
+    # Keys are pressed once the events are fetched, like ti.GUI:
+    assert not gui.is_pressed('w')
+    events = gui.get_events()
+    assert events[0].pos == (0.25, 0.5)
+    assert gui.is_pressed('w')
+    gui.show()
+    assert gui.get_events() == []
+    assert gui.is_pressed('w')
+    assert gui.get_cursor_pos() == (0.25, 0.5)
+    gui.show()
+    assert gui.get_event(ti.GUI.RELEASE)
+    assert not gui.is_pressed('w')
+    assert gui.get_image().shape == (4, 4, 4)
+    gui.show()
+    assert not gui.running
+
+
+def test_headless_circles():
+    gui = HeadlessGUI(res=(8, 8))
+    img = np.full((8, 8, 3), 0.5, dtype=np.float32)
+    gui.set_image(img)
+    gui.circles(np.array([[0.5, 0.5], [2, 2]]), radius=2, color=0xff0000)
+    ret = gui.get_image()
+    assert np.allclose(ret[4, 4, :3], [1, 0, 0])
+    assert np.allclose(ret[0, 0, :3], 0.5)
+    # Antialiased edges, and the image given to set_image is left as is:
+    assert 0.5 < ret[4, 2, 0] < 1
+    assert np.allclose(img, 0.5)
+
+
+class Ramp(Animation):
+    def on_init(self):
+        self.img = vec_array(3, float, 8, 4)
+        self.define_input()
+        self.define_uniform('iGain')
+        self.set_uniform('iGain', 0.5)
+
+    @ti.kernel
+    def on_render(self):
+        for I in ti.grouped(self.img):
+            self.img[I] = vec3(self.uniform('iGain') * self.iFrame)
+
+
+@ti.host_arch_only
+def test_headless_animation():
+    sink = RingBufferSink(3)
+    animation = Ramp()
+    animation.gui_backend = 'headless'
+    animation.frame_sink = sink
+    animation.max_frames = 5
+    animation.fixed_dt = 0.1
+    animation.substeps = 2
+    animation.start()
+    assert animation.steps == 10
+    assert animation.time == approx(1.0)
+    assert sink.frames.shape == (3, 8, 4, 3)
+    assert sorted(sink.frame_ids) == [2, 3, 4]
+    assert np.allclose(sink.frames[:, 0, 0, 0], [1.0, 1.5, 2.0])
+
+
+class Dots(Animation):
+    def on_init(self):
+        self.img = array(float, 16, 16)
+        self.circles = vec_array(2, float, 4)
+        self.colormap = 'viridis'
+
+    @ti.kernel
+    def on_start(self):
+        for i in self.circles:
+            self.circles[i] = vec(i * 0.2 + 0.2, 0.5)
+
+    @ti.kernel
+    def on_render(self):
+        for I in ti.grouped(self.img):
+            self.img[I] = I.x / 16
+
+
+@ti.host_arch_only
+def test_headless_display_fields():
+    pytest.importorskip('matplotlib')
+    sink = RingBufferSink(2)
+    animation = Dots()
+    assert isinstance(animation.colormap, ColormapLUT)
+    animation.gui_backend = 'headless'
+    animation.frame_sink = sink
+    animation.max_frames = 2
+    # Display fields are allocated before on_start runs any kernel:
+    animation.start()
+    assert sink.latest.shape == (16, 16, 3)
+    assert not np.allclose(sink.latest[3, 8], sink.latest[3, 2])
+
+
+@ti.host_arch_only
+def test_matplotlib_max_frames(monkeypatch):
+    plt = pytest.importorskip('matplotlib.pyplot')
+    from matplotlib.animation import AbstractMovieWriter
+
+    class CountingWriter(AbstractMovieWriter):
+        frames = 0
+
+        def setup(self, fig, outfile, dpi=None):
+            self.fig, self.outfile, self.dpi = fig, outfile, dpi
+
+        def grab_frame(self, **savefig_kwargs):
+            self.frames += 1
+
+        def finish(self):
+            pass
+
+    class Frames(Ramp):
+        def on_show(self):
+            self.shown.append(self.frame)
+
+    writer = CountingWriter()
+    animation = Frames()
+    animation.shown = []
+    animation.gui_backend = 'matplotlib'
+    animation.max_frames = 3
+    # Play the animation offscreen instead of opening a window:
+    monkeypatch.setattr(
+        plt, 'show',
+        lambda: animation._mpl_animation.save('unused', writer=writer))
+    animation.start()
+    assert writer.frames == 3
+    assert animation.shown == [0, 1, 2]
+
+
+class FakeNotebook:
+    def __init__(self):
+        self.frames = []
+
+    def ready(self):
+        return True
+
+    def show(self, img):
+        # ``gui.get_image()`` returns a buffer reused by the next frames:
+        self.frames.append(img.copy())
+        self.latest = img
+
+
+@ti.host_arch_only
+def test_notebook_single_readback():
+    class Notebook(Ramp):
+        def on_show(self):
+            self.canvas = self.gui.get_image()
+
+    animation = Notebook()
+    animation.gui_backend = 'ipython'
+    animation._notebook = FakeNotebook()
+    animation.max_frames = 3
+    animation.start()
+    frames = animation._notebook.frames
+    assert len(frames) == 3
+    # The notebook reuses the frame read back, the hidden canvas is unused:
+    assert animation._notebook.latest is animation._host_frame
+    assert np.allclose(frames[-1], 1.0)
+    assert not np.allclose(animation.canvas[:, :, :3], 1.0)
+
+
+@ti.host_arch_only
+def test_notebook_cpu_circles():
+    class Circles(Ramp):
+        def on_init(self):
+            super().on_init()
+            self.circles = vec_array(2, float, 1)
+            self.circles[0] = (0.5, 0.5)
+            self.gpu_circles = False
+            self.circle_color = 0xff0000
+            self.circle_radius = 2
+
+    animation = Circles()
+    animation.gui_backend = 'ipython'
+    animation._notebook = FakeNotebook()
+    animation.max_frames = 2
+    animation.start()
+    img = animation._notebook.frames[-1]
+    # CPU circles are only painted on the canvas, which is sent instead:
+    assert np.allclose(img[4, 2, :3], [1, 0, 0])
+    assert np.allclose(img[0, 0, :3], 0.5)
+
+
+@ti.host_arch_only
+def test_headless_cpu_circles():
+    class Circles(Ramp):
+        def on_init(self):
+            super().on_init()
+            self.circles = vec_array(2, float, 1)
+            self.circles[0] = (0.5, 0.5)
+            self.gpu_circles = False
+            self.circle_color = 0xff0000
+            self.circle_radius = 2
+
+    sink = RingBufferSink(1)
+    animation = Circles()
+    animation.gui_backend = 'headless'
+    animation.frame_sink = sink
+    animation.max_frames = 2
+    animation.start()
+    assert np.allclose(sink.latest[4, 2], [1, 0, 0])
+    assert np.allclose(sink.latest[0, 0], 0.5)
+
+
+@ti.host_arch_only
+def test_uniform_block():
+    class Uniforms(Animation):
+        def on_init(self):
+            self.define_input(capacity=16)
+            self.define_uniform('iGravity', 2)
+            self.define_uniform('iCount', dtype=ti.i32)
+
+    animation = Uniforms()
+    animation.set_uniform('iGravity', (0, -9.8))
+    animation.set_uniform('iCount', 7)
+    assert animation.uniform('iCount') == 7
+    assert animation.uniform('iGravity')[1] == approx(-9.8)
+    with pytest.raises(KeyError):
+        animation.define_uniform('iGravity')
+    with pytest.raises(ValueError):
+        animation.define_uniform('iHuge', 10)
+
+    x = vec_array(3, float)
+    frame = array(int)
+
+    @ti.kernel
+    def func():
+        g = animation.uniform('iGravity')
+        x[None] = vec(g.x, g.y, animation.uniform('iCount'))
+
+    animation._upload_uniforms()
+    func()
+    assert np.allclose(x.to_numpy(), [0, -9.8, 7])
+
+    # iFrame is stored as int32, exact beyond 2**24:
+    animation._upload_clock(0.0, 2**24 + 1)
+
+    @ti.kernel
+    def get_frame():
+        frame[None] = animation.iFrame
+
+    get_frame()
+    assert frame[None] == 2**24 + 1
+
+
+def test_render_scale_hysteresis(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr('time.time', lambda: clock[0])
+    animation = Animation()
+    animation.gui = HeadlessGUI()
+    animation.target_fps = 50
+
+    def frame(elapsed, events=()):
+        clock[0] += elapsed
+        animation._adapt_render_scale(list(events))
+        return animation.render_scale
+
+    busy = [HeadlessEvent(ti.GUI.PRESS, 'a')]
+    frame(0, busy)
+    while frame(0.08, busy) > animation.min_render_scale:
+        pass
+    interactive = animation.render_scale
+    # A few idle frames before refining, then one more step per frame:
+    assert frame(0.01) == interactive
+    assert frame(0.01) == interactive
+    assert frame(0.01) == interactive * 2
+    assert frame(0.04) == interactive * 4
+    assert frame(0.16) == 1
+    # Back to the interactive scale at once, not timed on refined frames:
+    assert frame(0.16, busy) == interactive
+    assert frame(0.08, busy) == interactive
+
+    animation.ensemble = object()
+    with pytest.raises(ValueError):
+        animation.start()
+
+
+@ti.host_arch_only
+def test_render_on_rescale():
+    class Counter(Animation):
+        def on_init(self):
+            self.img = array(float, 8, 8)
+            self.renders = []
+
+        def on_render(self):
+            self.renders.append(self.frame)
+
+    animation = Counter()
+    animation.gui_backend = 'headless'
+    animation.target_fps = 30
+    animation.render_every = 3
+    animation.max_frames = 6
+
+    def adapt(events):
+        animation.render_scale = 1.0 if animation.frame == 0 else 0.5
+
+    animation._adapt_render_scale = adapt
+    animation.start()
+    # Frame 1 renders at the new scale, instead of upscaling frame 0:
+    assert animation.renders == [0, 1, 3]
@@ -0,0 +1,46 @@
+from taichi_glsl import *
+import pytest
+
+
+@ti.host_arch_only
+def test_circles_tile_overflow():
+    n = 8
+    img = vec_array(3, float, 32, 32)
+    pos = vec_array(2, float, n * n)
+    raster = CircleRasterizer((32, 32), n * n)
+    small = CircleRasterizer((32, 32), n * n, tile_capacity=4)
+
+    @ti.kernel
+    def init():
+        # One circle per pixel, all in the first tile:
+        for i in pos:
+            pos[i] = (vec(i // n, i % n) + 0.5) / 32
+
+    init()
+    raster.paint(img, pos, radius=0.5, color=0xffffff)
+    assert raster.tile_capacity == n * n
+    with pytest.raises(RuntimeError):
+        small.paint(img, pos, radius=0.5, color=0xffffff)
+    img = img.to_numpy()
+    assert np.allclose(img[:n, :n], 1)
+    assert np.allclose(img[n:, :], 0)
+
+
+@ti.host_arch_only
+def test_circles_blend_order():
+    n = 256
+    img = vec_array(3, float, 32, 32)
+    pos = vec_array(2, float, n)
+    color = vec_array(3, float, n)
+    raster = CircleRasterizer((32, 32), n)
+
+    @ti.kernel
+    def init():
+        # All circles at the same place, the last one should be on top:
+        for i in pos:
+            pos[i] = vec(0.5, 0.5)
+            color[i] = vec(i / n, 0, 1 - i / n)
+
+    init()
+    raster.paint(img, pos, radius=4, color=color)
+    assert np.allclose(img.to_numpy()[16, 16], [(n - 1) / n, 0, 1 / n])
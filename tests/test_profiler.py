@@ -0,0 +1,58 @@
+from taichi_glsl import *
+import pytest
+import json
+
+
+def run_profiler(frames=2):
+    profiler = FrameProfiler(sync=False, trace=True)
+    for _ in range(frames):
+        profiler.begin_frame()
+        with profiler.scope('on_advance'):
+            pass
+        profiler.end_frame()
+    return profiler
+
+
+def test_profiler_stats():
+    profiler = run_profiler(3)
+    stats = profiler.stats()
+    assert list(stats) == ['on_advance', 'frame']
+    assert stats['frame']['min'] <= stats['frame']['p95']
+    assert 'on_advance' in profiler.report()
+
+
+def test_profiler_dump_csv(tmp_path):
+    path = str(tmp_path / 'trace.csv')
+    run_profiler().dump(path)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == 'frame,stage,start_ms,duration_ms'
+    assert [l.split(',')[:2] for l in lines[1:]] == [
+        ['0', 'on_advance'],
+        ['0', 'frame'],
+        ['1', 'on_advance'],
+        ['1', 'frame'],
+    ]
+
+
+def test_profiler_dump_json(tmp_path):
+    path = str(tmp_path / 'trace.json')
+    run_profiler().dump(path)
+    with open(path) as f:
+        events = json.load(f)
+    assert len(events) == 4
+    assert events[1]['frame'] == 0 and events[1]['stage'] == 'frame'
+    assert events[1]['duration_ms'] >= events[0]['duration_ms']
+
+
+def test_profiler_dump_chrome(tmp_path):
+    path = str(tmp_path / 'trace.json')
+    run_profiler().dump(path, format='chrome')
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+    assert len(events) == 4
+    assert all(e['ph'] == 'X' for e in events)
+    assert events[2]['name'] == 'on_advance'
+    assert events[2]['args'] == {'frame': 1}
+    with pytest.raises(ValueError):
+        run_profiler().dump(path, format='xml')
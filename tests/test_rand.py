@@ -107,4 +107,120 @@ def test_rand_unit_2d():
     mean_approx_test(ang, -math.pi, math.pi, rel=4e-1)
 
 
+@ti.host_arch_only
+def test_hash_rand():
+    n = 1024**2
+    x = array(float, n)
+
+    @ti.kernel
+    def fill(seed: ti.i32, k: ti.i32):
+        for i in x:
+            x[i] = hashRand(seed, i, k)
+
+    fill(233, 0)
+    a = x.to_numpy()
+    mean_approx_test(a, 0, 1)
+    fill(233, 0)
+    assert np.all(x.to_numpy() == a)
+    fill(233, 1)
+    assert np.mean(x.to_numpy() == a) < 1e-3
+    fill(234, 0)
+    assert np.mean(x.to_numpy() == a) < 1e-3
+
+
+def pcg_reference(v):
+    u = lambda x: np.uint64(x)
+    v = (np.asarray(v).astype(np.uint64) * u(747796405) +
+         u(2891336453)) & u(0xffffffff)
+    word = ((v >> ((v >> u(28)) + u(4))) ^ v) * u(277803737) & u(0xffffffff)
+    return (word >> u(22)) ^ word
+
+
+@ti.host_arch_only
+def test_hash_rand_reference():
+    n = 4096
+    x = array(float, n)
+
+    @ti.kernel
+    def fill():
+        for i in x:
+            x[i] = hashRand(-5, i, 3)
+
+    fill()
+    h = pcg_reference(np.array(-5).astype(np.uint32))
+    h = pcg_reference((h + np.arange(n, dtype=np.uint64)) % 2**32)
+    h = pcg_reference((h + np.uint64(3)) % 2**32)
+    assert np.all(x.to_numpy() == (h >> np.uint64(8)) / 2**24)
+
+
+@ti.host_arch_only
+def test_hash_unit_3d():
+    n = 1024
+    x = vec_array(3, float, n, 2)
+
+    @ti.kernel
+    def fill():
+        for I in ti.grouped(x):
+            x[I] = hashUnit3D(42, I, 0)
+
+    fill()
+    x = x.to_numpy().reshape(2 * n, 3)
+    assert np.sum(x**2, axis=1) == approx(np.ones(2 * n))
+    mean_approx_test(x[:, 2], -1, 1, rel=2e-1)
+
+
+@ti.host_arch_only
+def test_fill_range():
+    n = 1024**2
+    x = vec_array(2, float, n)
+    fillRange(x, (0.6, -1), (1.4, 3))
+    x = x.to_numpy()
+    mean_approx_test(x[:, 0], 0.6, 1.4)
+    mean_approx_test(x[:, 1], -1, 3)
+
+
+@ti.host_arch_only
+def test_fill_normal():
+    n = 1024**2
+    x = array(float, n)
+    fillNormal(x, 2, 0.5, seed=233)
+    a = x.to_numpy()
+    assert a.mean() == approx(2, rel=1e-2)
+    assert a.std() == approx(0.5, rel=1e-2)
+    fillNormal(x, 2, 0.5, seed=233)
+    assert np.all(x.to_numpy() == a)
+
+
+@ti.host_arch_only
+def test_fill_step():
+    n = 4096
+    x = vec_array(2, float, n)
+    y = vec_array(2, float, n)
+
+    @ti.kernel
+    def fill(seed: ti.i32, k: ti.i32):
+        for i in y:
+            y[i] = hashRandND(2, seed, i, k)
+
+    fillUniform(x, seed=233, step=1)
+    fill(233, 1)
+    a = x.to_numpy()
+    assert np.all(a == y.to_numpy())
+    fillUniform(x, seed=233, step=2)
+    assert np.mean(x.to_numpy() == a) < 1e-2
+    fillUniform(x, seed=233, step=1)
+    assert np.all(x.to_numpy() == a)
+
+
+@ti.host_arch_only
+def test_fill_solid_3d():
+    n = 1024**2
+    x = vec_array(3, float, n)
+    fillSolid3D(x, (1, 2, 3), 2)
+    r = np.sqrt(np.sum((x.to_numpy() - (1, 2, 3))**2, axis=1)) / 2
+    assert r.max() <= 1 + 1e-5
+    # P(r < t) = t**3 inside a ball:
+    assert np.mean(r < 0.5) == approx(1 / 8, rel=2e-2)
+
+
 test_rand_int()
@@ -0,0 +1,72 @@
+from taichi_glsl import *
+from pytest import approx
+import time
+
+
+def test_input_record_round_trip(tmp_path):
+    path = str(tmp_path / 'session.tsir')
+    motion = [
+        HeadlessEvent(ti.GUI.MOTION, ti.GUI.MOVE, (i / 300, 0.5))
+        for i in range(300)
+    ]
+    rec = InputRecorder(path)
+    rec.record(0, 0.0, 1, (0.1, 0.2), [],
+               [HeadlessEvent(ti.GUI.PRESS, ti.GUI.LMB, (0.1, 0.2))])
+    rec.record(1, 0.5, 2, (0.3, 0.4), [ti.GUI.LMB], motion)
+    rec.record(2, 1.0, 0, (0.5, 0.6), [ti.GUI.LMB, 'w'],
+               [HeadlessEvent(ti.GUI.RELEASE, ti.GUI.LMB, (0.5, 0.6))])
+    rec.close()
+    # Keys are interned, stored once in the key table:
+    assert len(rec.key_ids) == 3
+
+    frames = load_input_record(path)
+    assert sorted(frames) == [0, 1, 2]
+    assert frames[1]['time'] == 0.5
+    assert frames[1]['steps'] == 2
+    assert frames[1]['pos'] == approx((0.3, 0.4))
+    assert frames[1]['keys'] == [ti.GUI.LMB]
+    assert frames[2]['keys'] == [ti.GUI.LMB, 'w']
+    events = frames[1]['events']
+    assert len(events) == 300
+    assert all(e.type == ti.GUI.MOTION for e in events)
+    assert events[-1].pos == approx((299 / 300, 0.5))
+    assert frames[0]['events'][0].type == ti.GUI.PRESS
+    assert frames[2]['events'][0].key == ti.GUI.LMB
+    assert len(InputReplay(path)) == 3
+
+
+class Clock(Animation):
+    def on_init(self):
+        self.img = vec_array(3, float, 4, 4)
+        self.define_input()
+
+    def on_advance(self):
+        time.sleep(0.002)  # so that the wall clock moves within a frame
+
+    @ti.kernel
+    def on_render(self):
+        for I in ti.grouped(self.img):
+            self.img[I] = vec3(self.iTime, self.iFrame,
+                               self.uniform('iMouse').x)
+
+
+@ti.host_arch_only
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / 'session.tsir')
+    script = ScriptedInput(lambda frame: {'pos': (frame / 8, 0.5)})
+    recorded = RingBufferSink(6)
+    animation = Clock()
+    animation.gui_backend = 'headless'
+    animation.input_script = script
+    animation.frame_sink = recorded
+    animation.record_input = path
+    animation.max_frames = 6
+    animation.start()
+
+    replayed = RingBufferSink(6)
+    animation = Clock()
+    animation.frame_sink = replayed
+    animation.replay_input(path)
+    assert np.all(recorded.frames[:, :, :, 0] > 0)
+    # Same iTime, iFrame and cursor as the recorded run, to the bit:
+    assert np.array_equal(replayed.frames, recorded.frames)
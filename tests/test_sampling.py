@@ -0,0 +1,338 @@
+from taichi_glsl import *
+from pytest import approx
+import pytest
+
+
+@ti.host_arch_only
+def test_bilerp_at():
+    x = array(float, 4, 4)
+    x.from_numpy(np.arange(16, dtype=np.float32).reshape(4, 4))
+    pos = np.array([[0, 0], [1.5, 2], [2.25, 0.5], [3, 3]])
+    ret = bilerpAt(x, pos)
+    assert np.allclose(ret, pos[:, 0] * 4 + pos[:, 1])
+
+
+@ti.host_arch_only
+def test_sample_at_vector():
+    x = vec_array(2, float, 4)
+    pos = vec_array(1, float, 3)
+    x.from_numpy(np.arange(8, dtype=np.float32).reshape(4, 2))
+    ret = sampleAt(x, np.array([[1], [-1], [5]]))
+    assert np.allclose(ret, [[2, 3], [0, 1], [6, 7]])
+    ret = dflSampleAt(x, np.array([[1], [-1], [5]]), 9)
+    assert np.allclose(ret, [[2, 3], [9, 9], [9, 9]])
+    pos.from_numpy(np.array([[1], [-1], [5]], dtype=np.float32))
+    ret = dflSampleAt(x, pos, (8, 9))
+    assert np.allclose(ret, [[2, 3], [8, 9], [8, 9]])
+
+
+@ti.host_arch_only
+def test_trilerp_at_field():
+    x = array(float, 2, 2, 2)
+    y = array(float, 2, 2, 2)
+    pos = vec_array(3, float, 2)
+    out = array(float, 2)
+    x.from_numpy(np.arange(8, dtype=np.float32).reshape(2, 2, 2))
+    pos.from_numpy(np.array([[0.5, 0.5, 0.5], [1, 0, 0.5]], np.float32))
+    ret = trilerpAt(x, pos)
+    assert isinstance(ret, np.ndarray)
+    assert np.allclose(ret, [3.5, 4.5])
+    # Separate queries don't share their results:
+    y.fill(-1)
+    assert np.allclose(trilerpAt(y, pos), [-1, -1])
+    assert np.allclose(ret, [3.5, 4.5])
+    # Results stay on device in ``out``:
+    assert trilerpAt(x, pos, out) is out
+    assert np.allclose(out.to_numpy(), [3.5, 4.5])
+
+
+@ti.host_arch_only
+def test_sample_boundary():
+    x = array(int, 4)
+    x.from_numpy(np.arange(4, dtype=np.int32))
+    pos = np.array([[-2], [-1], [0], [3], [4], [5]])
+    assert np.allclose(sampleAt(x, pos), [0, 0, 0, 3, 3, 3])
+    assert np.allclose(sampleAt(x, pos, boundary='wrap'), [2, 3, 0, 3, 0, 1])
+    assert np.allclose(sampleAt(x, pos, boundary='mirror'), [1, 0, 0, 3, 3, 2])
+    assert np.allclose(sampleAt(x, pos, boundary='border', border=-1),
+                       [-1, -1, 0, 3, -1, -1])
+
+
+@ti.host_arch_only
+def test_bilerp_default():
+    x = array(float, 4, 4)
+    y = array(float, 3)
+    x.from_numpy(np.arange(16, dtype=np.float32).reshape(4, 4))
+
+    @ti.kernel
+    def func():
+        # Called without a boundary mode, i.e. 'clamp':
+        y[0] = bilerp(x, vec(1.5, 2))
+        y[1] = bilerp(x, vec(-1.0, 5.0))
+        y[2] = sample(x, vec(4, -1))
+
+    func()
+    assert np.allclose(y.to_numpy(), [8, 3, 12])
+
+
+@ti.host_arch_only
+def test_bilerp_wrap():
+    x = array(float, 4, 4)
+    x.from_numpy(np.arange(16, dtype=np.float32).reshape(4, 4))
+    ret = bilerpAt(x, np.array([[3.5, 0], [0, -0.5]]), boundary='wrap')
+    assert np.allclose(ret, [(12 + 0) / 2, (3 + 0) / 2])
+
+
+@ti.host_arch_only
+def test_cubic_linear_precision():
+    x = array(float, 8, 8)
+    y = array(float, 3, 3)
+    x.from_numpy(
+        np.fromfunction(lambda i, j: i * 2 + j, (8, 8), dtype=np.float32))
+
+    @ti.kernel
+    def func():
+        P = vec(3.25, 4.5)
+        y[0, 0] = bicubic(x, P)
+        y[0, 1] = catmullRom2D(x, P)
+        y[0, 2] = monotoneCubic2D(x, P)
+
+    func()
+    assert np.allclose(y.to_numpy()[0], 3.25 * 2 + 4.5)
+
+
+@ti.host_arch_only
+def test_monotone_cubic_no_overshoot():
+    x = array(float, 8, 8)
+    y = array(float, 7)
+    x.from_numpy(
+        np.repeat([[0], [0], [0], [0], [1], [1], [1], [1]], 8,
+                  1).astype(np.float32))
+
+    @ti.kernel
+    def func():
+        for i in y:
+            y[i] = monotoneCubic2D(x, vec(i + 0.5, 3.0))
+
+    func()
+    assert y.to_numpy().min() >= 0
+    assert y.to_numpy().max() <= 1
+
+
+@ti.host_arch_only
+def test_mip_pyramid():
+    x = array(float, 8, 8)
+    y = array(float, 2)
+    x.from_numpy(np.arange(64, dtype=np.float32).reshape(8, 8))
+    mip = MipPyramid(x)
+    mip.build()
+    assert len(mip.levels) == 4
+    assert mip.levels[3].to_numpy()[0, 0] == approx(31.5)
+
+    @ti.kernel
+    def func():
+        y[0] = textureLod(mip, vec(0.5, 0.5), 3.0)
+        y[1] = textureLod(mip, vec(0.5, 0.5), 0.0)
+
+    func()
+    assert np.allclose(y.to_numpy(), [31.5, 31.5])
+
+
+@ti.host_arch_only
+def test_mip_pyramid_odd_size():
+    x = array(float, 6, 5)
+    y = array(float)
+    x.fill(2)
+    mip = MipPyramid(x)
+    mip.build()
+    assert [l.shape for l in mip.levels] == [(6, 5), (3, 3), (2, 2), (1, 1)]
+    assert len(MipPyramid(array(float, 1000, 3)).levels) == 11
+
+    @ti.kernel
+    def func():
+        y[None] = textureLod(mip, vec(0.2, 0.7), 3.0)
+
+    func()
+    assert y[None] == approx(2)
+
+
+@ti.host_arch_only
+def test_summed_area_table():
+    x = array(float, 6, 5)
+    y = array(float, 3)
+    data = np.random.rand(6, 5).astype(np.float32)
+    x.from_numpy(data)
+    sat = SummedAreaTable(x)
+    sat.build()
+
+    @ti.kernel
+    def func():
+        y[0] = boxSum(sat, vec(1, 2), vec(4, 5))
+        y[1] = boxSample(sat, vec(-3, 0), vec(2, 9))
+        y[2] = boxSum(sat, vec(3, 3), vec(3, 4))
+
+    func()
+    assert y.to_numpy()[0] == approx(data[1:4, 2:5].sum(), rel=1e-4)
+    assert y.to_numpy()[1] == approx(data[0:2, :].mean(), rel=1e-4)
+    assert y.to_numpy()[2] == approx(0)
+
+
+@ti.host_arch_only
+def test_summed_area_table_1d():
+    x = array(int, 1000)
+    x.from_numpy(np.arange(1000, dtype=np.int32) % 7)
+    sat = SummedAreaTable(x)
+    sat.build()
+    assert np.all(sat.table.to_numpy()[1:] == np.cumsum(x.to_numpy()))
+
+
+@ti.host_arch_only
+def test_lerp_grad():
+    x = array(float, 8, 8)
+    y = vec_array(3, float, 3)
+    x.from_numpy(
+        np.fromfunction(lambda i, j: i * 2 + j, (8, 8), dtype=np.float32))
+
+    @ti.kernel
+    def func():
+        P = vec(3.25, 4.5)
+        y[0] = bilerpGrad(x, P)
+        y[1] = catmullRom2DGrad(x, P)
+        y[2] = bicubicGrad(x, P)
+
+    func()
+    for i in range(3):
+        assert np.allclose(y.to_numpy()[i], [3.25 * 2 + 4.5, 2, 1])
+
+
+@ti.host_arch_only
+def test_super_sample():
+    y = array(float, 4)
+
+    @ti.func
+    def f(P):
+        return P.x * 2 + P.y
+
+    @ti.kernel
+    def func():
+        P = vec(0.3, 0.7)
+        y[0] = superSample(f, P, 0.1)
+        y[1] = superSample(f, P, 0.1, 4, 'rgss', 'tent')
+        y[2] = superSample(f, P, 0.1, 3, 'grid', 'gaussian')
+        y[3] = superSample(f, P, 0.1, 2, 'jitter')
+
+    func()
+    assert np.allclose(y.to_numpy()[:3], 1.3)
+    assert y.to_numpy()[3] == approx(1.3, abs=0.1)
+
+
+@ti.host_arch_only
+def test_super_sample_field():
+    x = array(float, 4, 4)
+    x.from_numpy(np.arange(16, dtype=np.float32).reshape(4, 4))
+    y = array(float, 3)
+
+    @ti.kernel
+    def func():
+        y[0] = superSample2x2(None, vec(1.5, 1.5), 1, x)
+        y[1] = superSample2x2(None, vec(0.0, 0.0), 1, x, 'wrap')
+        y[2] = superSample(None, vec(-2.0, -2.0), 1, 2, 'grid', 'box', x,
+                           'border', 9)
+
+    func()
+    # Taps at (1.5, 1.5), (1.5, 1), (1, 1), (1, 1.5):
+    assert y[0] == approx((7.5 + 7 + 5 + 5.5) / 4)
+    # Taps at (0, 0), (0, -0.5), (-0.5, -0.5), (-0.5, 0), wrapping around:
+    assert y[1] == approx((0 + 1.5 + 7.5 + 6) / 4)
+    assert y[2] == approx(9)
+
+
+@ti.host_arch_only
+@pytest.mark.parametrize('n,pattern,filter', [(3, 'grid', 'box'),
+                                              (4, 'rgss', 'tent'),
+                                              (3, 'poisson', 'gaussian')])
+def test_super_sample_taps(n, pattern, filter):
+    taps = vec_array(2, float, n * n)
+    count = array(int)
+    y = array(float)
+
+    @ti.func
+    def f(P):
+        taps[ti.atomic_add(count[None], 1)] = P
+        return ti.sin(P.x * 7) * P.y**2
+
+    @ti.kernel
+    def func():
+        y[None] = superSample(f, vec(0.3, 0.7), 0.1, n, pattern, filter)
+
+    func()
+    from taichi_glsl.sampling import _superOffsets
+    off = np.array(_superOffsets(pattern, n))
+    if filter == 'box':
+        w = np.ones(n * n)
+    else:
+        off *= 2
+        if filter == 'tent':
+            w = np.prod(1 - np.abs(off), axis=1)
+        else:
+            w = np.exp(-2 * np.sum(off**2, axis=1))
+    P = np.array([0.3, 0.7]) + off * 0.1
+    assert count[None] == n * n
+    assert np.allclose(taps.to_numpy(), P, atol=1e-6)
+    expect = np.sum(w * np.sin(P[:, 0] * 7) * P[:, 1]**2) / np.sum(w)
+    assert y[None] == approx(expect, rel=1e-5)
+
+
+@ti.host_arch_only
+def test_sparse_bilerp():
+    x = ti.field(ti.f32)
+    ti.root.pointer(ti.ij, 4).dense(ti.ij, 4).place(x)
+    y = array(float, 4)
+
+    @ti.kernel
+    def func():
+        for i, j in ti.ndrange(4, 8):
+            x[i, j] = 1  # activates blocks (0, 0) and (0, 1)
+        y[0] = sparseBilerp(x, vec(1.5, 1.5), -1)
+        y[1] = sparseBilerp(x, vec(9.5, 9.5), -1)
+        y[2] = sparseBilerp(x, vec(3.5, 1.5), -1)
+        y[3] = sparseSample(x, vec(12, 3), -1)
+
+    func()
+    assert np.allclose(y.to_numpy(), [1, -1, 0, -1])
+
+
+@ti.host_arch_only
+def test_sparse_bilerp_vector():
+    x = ti.Vector.field(2, ti.f32)
+    ti.root.pointer(ti.ij, 4).dense(ti.ij, 4).place(x)
+    y = vec_array(2, float, 3)
+
+    @ti.kernel
+    def func():
+        for i, j in ti.ndrange(4, 4):
+            x[i, j] = vec(1, 2)  # activates block (0, 0) only
+        y[0] = sparseBilerp(x, vec(1.5, 1.5), -1)
+        y[1] = sparseBilerp(x, vec(9.5, 9.5), -1)
+        y[2] = sparseSample(x, vec(12, 3), -1)
+
+    func()
+    assert np.allclose(y.to_numpy(), [[1, 2], [-1, -1], [-1, -1]])
+
+
+@ti.host_arch_only
+def test_sparse_trilerp():
+    x = ti.field(ti.f32)
+    ti.root.bitmasked(ti.ijk, 2).dense(ti.ijk, 4).place(x)
+    y = array(float, 3)
+
+    @ti.kernel
+    def func():
+        for i, j, k in ti.ndrange(4, 4, 4):
+            x[i, j, k] = 2  # activates block (0, 0, 0) only
+        y[0] = sparseTrilerp(x, vec(1.5, 1.5, 1.5), -2)
+        y[1] = sparseTrilerp(x, vec(5.5, 1.5, 1.5), -2)
+        y[2] = sparseTrilerp(x, vec(1.5, 1.5, 3.5), -2)
+
+    func()
+    assert np.allclose(y.to_numpy(), [2, -2, 0])